@@ -17,13 +17,15 @@ logging.basicConfig(
 )
 
 
-def process_dataset(dataset_name, dataset_root_path, skip_existing=False):
+def process_dataset(dataset_name, dataset_root_path, skip_existing=False, max_workers=1):
     """
     批量处理指定数据集下的所有数据库。
 
     :param dataset_name: 数据集名称 (e.g., 'bird', 'spider')，用于生成输出目录层级
     :param dataset_root_path: 数据集根目录 (包含各个数据库文件夹的目录)
     :param skip_existing: 如果目标 pkl 文件已存在，是否跳过
+    :param max_workers: 单个库内并行分析表的进程数，默认 1 (串行)；
+                        仅对表数不少于 SchemaPipeline.PARALLEL_MIN_TABLES 的库生效
     """
     root_dir = Path(dataset_root_path)
 
@@ -86,7 +88,7 @@ def process_dataset(dataset_name, dataset_root_path, skip_existing=False):
             pbar.set_postfix(status="Processing", db=db_name)
 
             # 这里的 SchemaPipeline 封装了所有细节：SQLite读取 -> 分析 -> 构建图 -> 保存
-            pipeline = SchemaPipeline(str(sqlite_path), str(output_pkl))
+            pipeline = SchemaPipeline(str(sqlite_path), str(output_pkl), max_workers=max_workers)
             pipeline.run()  # 内部已经包含了 tqdm (列级别)
 
             success_count += 1
@@ -114,6 +116,9 @@ if __name__ == "__main__":
     # 2. SPIDER 数据集配置
     # spider_path = getattr(paths, "SPIDER_TRAIN", r"../data/spider/database")
 
+    # 3. 库内并行进程数：默认 1 串行；表很多的库 (>= PARALLEL_MIN_TABLES) 可按 CPU 核数调大
+    max_workers = 1
+
     # ================= 执行区域 =================
 
     # 执行 BIRD
@@ -121,11 +126,12 @@ if __name__ == "__main__":
         process_dataset(
             dataset_name="bird",
             dataset_root_path=bird_path,
-            skip_existing=True  # 【修改】开启跳过模式，避免覆盖生成
+            skip_existing=True,  # 【修改】开启跳过模式，避免覆盖生成
+            max_workers=max_workers
         )
     else:
         print(f"❌ 未找到 BIRD 数据集路径: {bird_path}")
 
     # 执行 SPIDER (稍后配置好路径后取消注释)
     # if os.path.exists(spider_path):
-    #     process_dataset("spider", spider_path, skip_existing=True)
+    #     process_dataset("spider", spider_path, skip_existing=True, max_workers=max_workers)
@@ -4,18 +4,48 @@ import os
 import networkx as nx
 from tqdm import tqdm
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    # Optional faster JSON decoder; falls back to the stdlib when not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional streaming JSON parser, only used for very large exports
+    import ijson
+except ImportError:
+    ijson = None
 
 # Ensure we can import from src if needed, though we rely mostly on standard libraries here
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 
 class GraphRepoConverter:
-    def __init__(self, input_root, output_root):
+    # Exports larger than this are streamed item by item with ijson (if installed)
+    # instead of being parsed into one in-memory list
+    STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024
+    # Nodes/edges are inserted into the graph in batches of this size
+    BATCH_SIZE = 10000
+
+    def __init__(self, input_root, output_root, max_workers=None):
+        """
+        :param max_workers: Number of worker processes for convert_all, defaults to the CPU count;
+                            1 converts serially in the current process
+        """
         self.input_root = input_root
         self.output_root = output_root
+        self.max_workers = max_workers or os.cpu_count() or 1
 
-    def convert_all(self):
+    def convert_all(self, skip_up_to_date=False):
         """
         Walk through the input directory and convert all valid graph datasets.
+
+        :param skip_up_to_date: Skip a dataset when its .pkl is newer than both JSON
+                                sources, so repeated runs do not re-parse the JSON.
+                                Off by default: the check only looks at mtimes, so after
+                                a change to the converter logic existing pkl files would
+                                be kept stale.
         """
         print(f"Scanning {self.input_root}...")
         
@@ -31,35 +61,98 @@ class GraphRepoConverter:
 
         print(f"Found {len(tasks)} datasets to convert.")
         
-        for folder_path in tqdm(tasks, desc="Converting"):
-            rel_path = os.path.relpath(folder_path, self.input_root)
-            output_dir = os.path.join(self.output_root, rel_path)
-            dataset_name = os.path.basename(folder_path)
-            output_file = os.path.join(output_dir, f"{dataset_name}.pkl")
-            
-            os.makedirs(output_dir, exist_ok=True)
-            
-            nodes_file = os.path.join(folder_path, "nodes.json")
-            rels_file = os.path.join(folder_path, "relationships.json")
-            
+        # Datasets are independent (read two JSON files, write one pickle), so they
+        # are converted in a process pool; JSON decoding holds the GIL, threads would not help.
+        workers = min(self.max_workers, len(tasks))
+        skip_flags = [skip_up_to_date] * len(tasks)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(tqdm(pool.map(self.convert_folder, tasks, skip_flags),
+                                    total=len(tasks), desc="Converting"))
+        else:
+            results = list(tqdm(map(self.convert_folder, tasks, skip_flags),
+                                total=len(tasks), desc="Converting"))
+
+        skipped = results.count("skipped")
+        if skipped:
+            print(f"Skipped {skipped} datasets with up-to-date pkl files.")
+
+    def convert_folder(self, folder_path, skip_up_to_date=False):
+        """
+        Convert one dataset folder (runs in a worker process when convert_all is parallel).
+        Errors are caught per dataset so one broken export does not abort the batch.
+
+        :return: "converted", "skipped" or "error"
+        """
+        rel_path = os.path.relpath(folder_path, self.input_root)
+        output_dir = os.path.join(self.output_root, rel_path)
+        dataset_name = os.path.basename(folder_path)
+        output_file = os.path.join(output_dir, f"{dataset_name}.pkl")
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        nodes_file = os.path.join(folder_path, "nodes.json")
+        rels_file = os.path.join(folder_path, "relationships.json")
+
+        if skip_up_to_date and self._is_up_to_date(output_file, nodes_file, rels_file):
+            return "skipped"
+
+        try:
+            self.convert_single(nodes_file, rels_file, output_file)
+        except Exception as e:
+            print(f"Error converting {folder_path}: {e}")
+            return "error"
+        return "converted"
+
+    @staticmethod
+    def _is_up_to_date(output_file, *source_files):
+        """The cached pickle is reusable if it is newer than every JSON source."""
+        if not os.path.exists(output_file):
+            return False
+        output_mtime = os.path.getmtime(output_file)
+        return all(os.path.getmtime(src) <= output_mtime for src in source_files)
+
+    @staticmethod
+    def _load_json(path):
+        """
+        Read a JSON export as bytes and decode it with orjson when available.
+        orjson rejects a few inputs the stdlib accepts (NaN/Infinity literals,
+        integers beyond 64 bits), so those files fall back to json.loads.
+        """
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if orjson is not None:
             try:
-                self.convert_single(nodes_file, rels_file, output_file)
-            except Exception as e:
-                print(f"Error converting {folder_path}: {e}")
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(raw)
+
+    def _iter_json_array(self, path):
+        """
+        Yield the items of a top-level JSON array.
+        Huge files are streamed with ijson so the parsed tree never has to fit in memory;
+        everything else goes through _load_json (orjson / json).
+        """
+        if ijson is not None and os.path.getsize(path) > self.STREAM_THRESHOLD_BYTES:
+            with open(path, 'rb') as f:
+                # use_float: keep floats as float like json/orjson (ijson defaults to Decimal)
+                yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from self._load_json(path)
 
     def convert_single(self, nodes_path, rels_path, output_path):
         G = nx.DiGraph()
         
-        with open(nodes_path, 'r', encoding='utf-8') as f:
-            nodes_data = json.load(f)
-            
-        with open(rels_path, 'r', encoding='utf-8') as f:
-            rels_data = json.load(f)
-            
         old_id_map = {}
+        # Collect (id, attrs) / (u, v, attrs) tuples and insert them in batches with
+        # add_nodes_from / add_edges_from (same semantics as repeated add_node/add_edge)
+        nodes_list = []
+        edges_list = []
         
         # 1. Process Nodes
-        for node_item in nodes_data:
+        # (relationships.json is only read after all nodes are in the graph)
+        for node_item in self._iter_json_array(nodes_path):
             old_id = node_item.get('old_id')
             labels = node_item.get('labels', [])
             props = node_item.get('properties', {})
@@ -94,10 +187,15 @@ class GraphRepoConverter:
             if node_id:
                 old_id_map[old_id] = node_id
                 # Clean up properties if needed, but keeping them all is usually safer
-                G.add_node(node_id, **props)
+                nodes_list.append((node_id, props))
+                if len(nodes_list) >= self.BATCH_SIZE:
+                    G.add_nodes_from(nodes_list)
+                    nodes_list = []
+
+        G.add_nodes_from(nodes_list)
 
         # 2. Process Relationships
-        for rel in rels_data:
+        for rel in self._iter_json_array(rels_path):
             start_old = rel.get("start_old_id")
             end_old = rel.get("end_old_id")
             rel_type = rel.get("type")
@@ -112,21 +210,35 @@ class GraphRepoConverter:
                 # NetworkX edge attributes are flattened
                 edge_attrs = {"type": rel_type}
                 edge_attrs.update(props)
-                G.add_edge(start_node, end_node, **edge_attrs)
+                edges_list.append((start_node, end_node, edge_attrs))
+                if len(edges_list) >= self.BATCH_SIZE:
+                    G.add_edges_from(edges_list)
+                    edges_list = []
             else:
                 # If nodes are missing (filtered out?), skip
                 pass
+
+        G.add_edges_from(edges_list)
                 
         # 3. Save to PKL
         with open(output_path, 'wb') as f:
-            pickle.dump(G, f)
+            pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 if __name__ == "__main__":
+    import argparse
+
     # Default paths based on user request and environment
     input_repo = r"d:\MVP-SQL\graphrepo"
     # User didn't specify output, creating a new directory parallel to graphrepo or inside it
     # Let's create a new top-level directory for the converted pkls
     output_repo = r"d:\MVP-SQL\converted_graph_pkl"
-    
-    converter = GraphRepoConverter(input_repo, output_repo)
-    converter.convert_all()
+
+    parser = argparse.ArgumentParser(description="Convert the JSON graph repo into NetworkX pkl files.")
+    parser.add_argument("--input", default=input_repo, help="Source graph repo directory")
+    parser.add_argument("--output", default=output_repo, help="Destination directory for the pkl files")
+    parser.add_argument("--skip-up-to-date", action="store_true",
+                        help="Skip folders whose pkl is newer than every source JSON file")
+    args = parser.parse_args()
+
+    converter = GraphRepoConverter(args.input, args.output)
+    converter.convert_all(skip_up_to_date=args.skip_up_to_date)
@@ -1,4 +1,5 @@
 import networkx as nx
+from collections import defaultdict
 from .utils import generate_fk_hash
 
 
@@ -9,6 +10,8 @@ class GraphBuilder:
         使用 DiGraph (有向图) 存储 Schema 结构。
         """
         self.G = nx.DiGraph()
+        # 待写回的外键引用 (由 finalize 统一更新节点的引用列表)
+        self._pending_fks = []
 
     def add_table_node(self, table_name, **properties):
         """
@@ -18,18 +21,16 @@ class GraphBuilder:
         :param properties: 表的其他属性 (row_count, primary_key 等)
         """
         # 在 NetworkX 中，add_node 如果节点已存在会更新属性，不存在则创建
-        # 我们预先初始化列表属性，确保后续 append 操作安全
-        base_props = {
-            "type": "Table",
-            "name": table_name,
-            # 预初始化引用列表，替代 Neo4j 的 coalesce 操作
-            "reference_to": [],
-            "referenced_by": []
-        }
-        # 合并传入的属性 (properties 覆盖 base_props)
-        final_props = {**base_props, **properties}
-
-        self.G.add_node(table_name, **final_props)
+        # 直接在节点属性字典上原地写入，省去 base_props / 合并结果两个中间字典
+        self.G.add_node(table_name)
+        attrs = self.G.nodes[table_name]
+        attrs["type"] = "Table"
+        attrs["name"] = table_name
+        # 预初始化引用列表，替代 Neo4j 的 coalesce 操作
+        attrs["reference_to"] = []
+        attrs["referenced_by"] = []
+        # 合并传入的属性 (properties 覆盖上面的基础属性)
+        attrs.update(properties)
 
     def add_column_node(self, table_name, column_name, is_primary_key, is_foreign_key, **properties):
         """
@@ -41,26 +42,23 @@ class GraphBuilder:
         # 1. 生成列节点的唯一 Key (格式: "Table.Column")
         col_node_id = f"{table_name}.{column_name}"
 
-        # 2. 准备属性
-        base_props = {
-            "type": "Column",
-            "name": column_name,
-            "belongs_to": table_name,  # 保留所属关系属性方便反查
-            "referenced_to": [],  # 预初始化
-            "referenced_by": [],
-            # --- 【修正】显式将主外键状态写入节点属性 ---
-            "is_primary_key": is_primary_key,
-            "is_foreign_key": is_foreign_key
-        }
+        # 2. 添加列节点，并原地写入基础属性
+        self.G.add_node(col_node_id)
+        attrs = self.G.nodes[col_node_id]
+        attrs["type"] = "Column"
+        attrs["name"] = column_name
+        attrs["belongs_to"] = table_name  # 保留所属关系属性方便反查
+        attrs["referenced_to"] = []  # 预初始化
+        attrs["referenced_by"] = []
+        # --- 【修正】显式将主外键状态写入节点属性 ---
+        attrs["is_primary_key"] = is_primary_key
+        attrs["is_foreign_key"] = is_foreign_key
 
         # 3. 合并其他属性
         # 注意：如果 properties (即 pipeline 传来的 final_props) 中也包含同名key，
-        # 这里的合并顺序 {**base, **prop} 会让 properties 覆盖 base_props。
+        # update 会让 properties 覆盖上面的基础属性。
         # 由于 pipeline 中没有传这两个值进 final_props，所以这里是安全的。
-        final_props = {**base_props, **properties}
-
-        # 4. 添加列节点
-        self.G.add_node(col_node_id, **final_props)
+        attrs.update(properties)
 
         # 5. 确定关系类型 (完全保留原逻辑用于区分 PK/FK)
         if is_primary_key and is_foreign_key:
@@ -82,7 +80,7 @@ class GraphBuilder:
         """
         处理外键逻辑：
         1. 创建 Table -> Table 的边
-        2. 更新 4 个相关节点的引用列表 (referenced_by / reference_to)
+        2. 登记外键，4 个相关节点的引用列表 (referenced_by / reference_to) 由 finalize 统一写回
         """
         # 构造辅助 ID
         reference_path = f"{from_table}.{from_column}={to_table}.{to_column}"
@@ -98,38 +96,51 @@ class GraphBuilder:
                         reference_path=reference_path,
                         fk_hash=fk_hash)
 
-        # 2. 更新节点属性 (Python 内存操作比 Cypher 简单得多)
-        # 我们直接获取节点对象引用 (字典)，然后操作列表
-
-        # Helper：安全追加列表的闭包函数
-        def safe_append(node_id, prop_key, value):
-            if self.G.has_node(node_id):
-                # 直接访问字典，比 set_node_attributes 更快
-                node_attrs = self.G.nodes[node_id]
-                # 确保列表存在 (虽然 add_node 时已初始化，但防守式编程不亏)
-                if prop_key not in node_attrs:
-                    node_attrs[prop_key] = []
-                node_attrs[prop_key].append(value)
+        # 2. 登记待写回的引用
+        self._pending_fks.append((from_table, from_column, to_table, to_column, reference_path))
 
-        # A. 更新目标表 (被谁引用了)
-        safe_append(to_table, "referenced_by", reference_path)
-
-        # B. 更新源表 (引用了谁)
-        safe_append(from_table, "reference_to", reference_path)
-
-        # C. 更新源列 (引用了谁)
-        from_col_id = f"{from_table}.{from_column}"
-        safe_append(from_col_id, "referenced_to", f"{to_table}.{to_column}")
+    def finalize(self):
+        """
+        将登记的外键引用批量写回节点属性。
+        先按节点汇总四类引用列表，再通过 nx.set_node_attributes 一次性写入，
+        替代逐个外键的 has_node 检查与列表追加。必须在 save_graph 之前调用。
+        """
+        refs = {
+            "referenced_by": defaultdict(list),
+            "reference_to": defaultdict(list),
+            "referenced_to": defaultdict(list),
+        }
 
-        # D. 更新目标列 (被谁引用了)
-        to_col_id = f"{to_table}.{to_column}"
-        safe_append(to_col_id, "referenced_by", f"{from_table}.{from_column}")
+        for from_table, from_column, to_table, to_column, reference_path in self._pending_fks:
+            from_col_id = f"{from_table}.{from_column}"
+            to_col_id = f"{to_table}.{to_column}"
+
+            # A. 目标表 (被谁引用了)
+            refs["referenced_by"][to_table].append(reference_path)
+            # B. 源表 (引用了谁)
+            refs["reference_to"][from_table].append(reference_path)
+            # C. 源列 (引用了谁)
+            refs["referenced_to"][from_col_id].append(f"{to_table}.{to_column}")
+            # D. 目标列 (被谁引用了)
+            refs["referenced_by"][to_col_id].append(f"{from_table}.{from_column}")
+
+        for prop_key, by_node in refs.items():
+            # 与已有列表合并；只更新图中存在的节点 (与原 safe_append 行为一致)
+            values = {
+                node_id: self.G.nodes[node_id].get(prop_key, []) + new_refs
+                for node_id, new_refs in by_node.items()
+                if node_id in self.G
+            }
+            nx.set_node_attributes(self.G, values, prop_key)
+
+        self._pending_fks = []
 
     def save_graph(self, output_path):
         """
         将图保存到磁盘。
         推荐使用 pickle (Python 原生) 或 gexf/graphml (通用格式)。
         这里默认用 pickle，因为它能完美保留 Python 对象类型 (如列表、None)。
+        使用 pickle.HIGHEST_PROTOCOL，序列化/反序列化均比默认协议更快，读取端无需改动。
         """
         import pickle
         # 确保目录存在
@@ -137,7 +148,7 @@ class GraphBuilder:
         os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
 
         with open(output_path, 'wb') as f:
-            pickle.dump(self.G, f)
+            pickle.dump(self.G, f, protocol=pickle.HIGHEST_PROTOCOL)
         print(f"Graph successfully saved to {output_path}")
 
     def get_graph(self):
@@ -1,9 +1,7 @@
 import random
 import json
-import operator
 import numpy as np
 from collections import Counter
-from decimal import Decimal
 from datetime import datetime, date
 from dateutil import parser
 from .utils import convert_date_string
@@ -22,56 +20,102 @@ class DataProfiler:
         ]
         self.time_types = ["DATE", "DATETIME", "TIMESTAMP"]
 
-    def profile(self, all_values, data_type, column_name=""):
+    def profile(self, all_values, data_type, column_name="", light=False):
         """
         对列数据进行分析，返回统计属性字典。
         对应原代码 _get_column_samples_and_attributes 中非 SQL 的部分。
         """
+        return self.profile_stream(all_values, data_type, column_name, light=light)
+
+    def profile_stream(self, values, data_type, column_name="", sample_size=6, light=False):
+        """
+        分析列数据 (通常为 SQLiteHandler.fetch_all_columns 返回的列列表)：
+        单次遍历同时完成空值统计与蓄水池采样，无需再单独构建非空值列表做 random.sample。
+
+        仅当列类型需要做数值/文本/时间统计时才额外保留非空值列表。
+
+        :param light: 轻量模式 (用于单列主键)，只计算完整性统计、样本与数值范围，
+                      跳过众数、平均值、词频、类别与时间跨度等统计
+        """
         attributes = {}
         base_data_type = data_type.split('(')[0].upper()
+        keep_values = (base_data_type in self.numeric_types
+                       or (not light and (base_data_type in self.text_types
+                                          or base_data_type in self.time_types)))
+
+        # 1. 单次遍历: 空值统计 + 蓄水池采样 (Algorithm R，每条最多保留 sample_size 个样本)
+        total_count = 0
+        null_count = 0
+        non_null_count = 0
+        non_null_values = []
+        samples = []
+
+        for value in values:
+            total_count += 1
+            if value is None or (isinstance(value, str) and value.strip() == ""):
+                null_count += 1
+                continue
 
-        # 1. 空值过滤与完整性统计
-        def is_empty(value):
-            return value is None or (isinstance(value, str) and value.strip() == "")
+            if non_null_count < sample_size:
+                samples.append(value)
+            else:
+                j = random.randrange(non_null_count + 1)
+                if j < sample_size:
+                    samples[j] = value
+            non_null_count += 1
 
-        non_null_values = [v for v in all_values if not is_empty(v)]
+            if keep_values:
+                non_null_values.append(value)
 
-        null_count = len(all_values) - len(non_null_values)
+        # 2. 完整性统计
         attributes['null_count'] = null_count
         attributes['data_integrity'] = "{:.0f}%".format(
-            len(non_null_values) / len(all_values) * 100) if all_values else "100%"
-        attributes['sample_count'] = len(non_null_values) if non_null_values else 0
+            non_null_count / total_count * 100) if total_count else "100%"
+        attributes['sample_count'] = non_null_count
 
-        # 2. 采样 (Sampling)
-        samples = []
+        # 3. 采样结果 (文本类型保留原逻辑: >30 字符截断)
+        # 在蓄水池列表上原地截断，不再额外分配新列表；非字符串值 (如文本列中混入的数字) 原样保留
         if base_data_type in self.text_types:
-            # 文本类型随机抽样最多 6 条
-            samples = random.sample(non_null_values, min(len(non_null_values), 6))
-            # 文本截断处理 (保留原逻辑: >30 字符截断)
             max_length = 30
-            samples = [s[:max_length] + '...' if len(s) > max_length else s for s in samples]
-        else:
-            # 其他类型随机抽样最多 6 条
-            samples = random.sample(non_null_values, min(len(non_null_values), 6))
+            for i, s in enumerate(samples):
+                if isinstance(s, str) and len(s) > max_length:
+                    samples[i] = s[:max_length] + '...'
 
         attributes['samples'] = samples
 
-        # 3. 类型特定的统计分析
+        # 4. 类型特定的统计分析
         if base_data_type in self.numeric_types:
-            self._analyze_numeric(non_null_values, base_data_type, column_name, attributes)
+            self._analyze_numeric(non_null_values, base_data_type, column_name, attributes, light=light)
 
-        elif base_data_type in self.text_types:
+        elif not light and base_data_type in self.text_types:
             self._analyze_text(non_null_values, attributes)
 
-        elif base_data_type in self.time_types:
+        elif not light and base_data_type in self.time_types:
             self._analyze_time(non_null_values, attributes)
 
         return attributes
 
-    def _analyze_numeric(self, values, data_type, column_name, attributes):
-        """数值类型分析逻辑"""
+    def profile_integer_key(self, data_type, summary):
+        """
+        由 SQLiteHandler.get_integer_key_summary 的结果直接构造单列整数主键的统计属性，
+        与 profile_stream(light=True) 对同一列的输出字段一致 (完整性、样本、数值范围)。
+        非数值类型返回 None，由调用方走常规流程。
+        """
+        base_data_type = data_type.split('(')[0].upper()
+        if base_data_type not in self.numeric_types:
+            return None
+        return {
+            'null_count': 0,
+            'data_integrity': "100%",
+            'sample_count': summary['count'],
+            'samples': summary['samples'],
+            'numeric_range': [summary['min'], summary['max']],
+        }
+
+    def _analyze_numeric(self, values, data_type, column_name, attributes, light=False):
+        """数值类型分析逻辑 (light=True 时只计算数值范围)"""
         # 过滤掉非数值型数据
-        valid_values = [v for v in values if isinstance(v, (int, float)) and v != '']
+        valid_values = [v for v in values if isinstance(v, (int, float))]
 
         # 保留原代码警告逻辑
         filtered_count = len(values) - len(valid_values)
@@ -79,28 +123,29 @@ class DataProfiler:
             print(f"过滤掉了 {column_name} 的 {filtered_count} 个非数值数据")
 
         try:
-            # 计算范围
-            attributes['numeric_range'] = [min(valid_values), max(valid_values)] if valid_values else None
+            # 一次性构建 NumPy 数组，后续 min/max/mean/众数 均在 C 层完成
+            # (整数列保持 int64，超出 int64 范围时 NumPy 自动退化为 object)
+            arr = np.asarray(valid_values)
+
+            # 计算范围 (按下标取回原始 Python 值，避免 numpy 标量写入图)
+            attributes['numeric_range'] = [valid_values[arr.argmin()], valid_values[arr.argmax()]] if valid_values else None
 
             is_id_column = "id" in column_name.lower()
-            if not is_id_column:
+            if not is_id_column and not light:
                 # 计算众数
-                mode = self._get_mode(valid_values)
+                mode = self._get_mode(valid_values, arr)
                 if mode:
                     attributes['numeric_mode'] = mode
 
                 # 计算平均值
+                # SQLite 只会返回 int/float，DECIMAL/NUMERIC 的 float(Decimal(str(v))) 与直接取 float 结果相同；
+                # BOOLEAN 列保留原逻辑，先对每个值做 int(v) 截断再求平均
                 if valid_values:
                     try:
-                        if data_type in ["DECIMAL", "NUMERIC"]:
-                            # Decimal 转换处理
-                            attributes['numeric_mean'] = float(
-                                np.mean([float(Decimal(str(v))) for v in valid_values]))
-                        elif data_type == "BOOLEAN":
-                            attributes['numeric_mean'] = float(
-                                np.mean([int(v) for v in valid_values]))
+                        if data_type == "BOOLEAN":
+                            attributes['numeric_mean'] = float(np.mean([int(v) for v in valid_values]))
                         else:
-                            attributes['numeric_mean'] = float(np.mean(valid_values))
+                            attributes['numeric_mean'] = float(arr.mean())
                     except Exception as e:
                         print(f"计算平均值时出错: {e}, 列名: {column_name}")
                         attributes['numeric_mean'] = None
@@ -112,12 +157,21 @@ class DataProfiler:
 
     def _analyze_text(self, values, attributes):
         """文本类型分析逻辑"""
-        # 类别型数据检测 (唯一值 <= 6)
-        if len(set(values)) <= 6:
-            attributes['text_categories'] = list(set(values))
+        # 类别型数据检测 (唯一值 <= 6)：超过 6 个唯一值立即停止扫描
+        categories = set()
+        for v in values:
+            categories.add(v)
+            if len(categories) > 6:
+                categories = None
+                break
+        # 字符总长度：sum(map(len, ...)) 完全在 C 层完成归约
+        total_length = sum(map(len, values))
+
+        if categories is not None:
+            attributes['text_categories'] = list(categories)
 
         # 平均字符长度
-        attributes['average_char_length'] = self._get_average_char_length(values) if values else 0
+        attributes['average_char_length'] = total_length / len(values) if values else 0
 
         # 词频统计
         word_frequency_dict = self._get_word_frequency(values) if values else {}
@@ -126,34 +180,45 @@ class DataProfiler:
     def _analyze_time(self, values, attributes):
         """时间类型分析逻辑"""
         if values:
-            attributes['time_span'] = self._get_time_span(values)
-            time_attributes = self._calculate_time_attributes(values)
+            # 所有值只解析一次，时间跨度与最早/最晚时间共用解析结果
+            span_values, attr_values = self._parse_time_values(values)
+            attributes['time_span'] = self._get_time_span(span_values)
+            time_attributes = self._calculate_time_attributes(attr_values)
             attributes.update(time_attributes)
         else:
             attributes['time_span'] = None
 
     # --- 私有辅助方法 (原样迁移) ---
 
-    def _get_mode(self, values):
-        """获取众数，支持返回多个众数"""
-        if not values:
+    def _get_mode(self, values, arr):
+        """
+        获取众数，支持返回多个众数。
+        values 为原始值列表，arr 为对应的 NumPy 数组；
+        返回值按下标取回原始 Python 对象 (不会把混合 int/float 列中的 3 变成 3.0)，
+        多个众数按首次出现的顺序排列 (与 Counter 的结果一致)。
+        """
+        if arr.size == 0:
             return []
-        if all(isinstance(v, Decimal) for v in values):
-            values = [float(v) for v in values]
-        if all(isinstance(v, bool) for v in values):
-            values = [int(v) for v in values]
-
-        count_dict = Counter(values)
-        max_count = max(count_dict.values())
-        if max_count <= 1:
+        is_bool = arr.dtype == np.bool_
+        if is_bool:
+            arr = arr.astype(np.int64)
+
+        # 稳定排序后相邻比较：一次向量化扫描即可判断是否存在重复值
+        order = np.argsort(arr, kind='stable')
+        sorted_values = arr[order]
+        repeats = sorted_values[1:] == sorted_values[:-1]
+        if not repeats.any():
+            # 所有值均唯一 (如 ID 类列)，无需再统计频次
             return []
-        return [k for k, v in count_dict.items() if v == max_count]
 
-    def _get_average_char_length(self, values):
-        if values:
-            total_length = sum(len(v) for v in values)
-            return total_length / len(values)
-        return 0
+        # 由相邻值变化位置切分出连续段，段长即频次；稳定排序保证段首即该值首次出现的位置
+        starts = np.flatnonzero(np.concatenate(([True], ~repeats)))
+        counts = np.diff(np.append(starts, sorted_values.size))
+        first_indices = np.sort(order[starts[counts == counts.max()]])
+        if is_bool:
+            # 全为布尔值时按原逻辑转为 int
+            return [int(values[i]) for i in first_indices]
+        return [values[i] for i in first_indices]
 
     def _get_word_frequency(self, values, top_k=10, by_word=False):
         """
@@ -169,58 +234,78 @@ class DataProfiler:
         else:
             word_count_dict = Counter(values)
 
-        sorted_word_count_dict = dict(
-            sorted(word_count_dict.items(), key=operator.itemgetter(1), reverse=True)
-        )
-
         result = {}
-        one_freq_count = 0
-        found_one_freq = False
 
-        for word, freq in sorted_word_count_dict.items():
-            if len(result) >= top_k:
-                break
+        # most_common(top_k) 基于堆选取，O(N log k)，无需对全部词做排序
+        # (与 sorted 一样是稳定的：同频词保持首次出现的顺序)
+        for word, freq in word_count_dict.most_common(top_k):
             if freq == 1:
-                found_one_freq = True
-                if len(word) <= 20 and one_freq_count < 3:
+                break
+            result[word] = freq
+
+        # 高频词不足 top_k 时，按首次出现顺序补充频率为1的词 (最多3个，长度不超过20)
+        if len(result) < top_k:
+            one_freq_count = 0
+            for word, freq in word_count_dict.items():
+                if freq == 1 and len(word) <= 20:
                     result[word] = freq
                     one_freq_count += 1
-            else:
-                if not found_one_freq:
-                    result[word] = freq
+                    if one_freq_count >= 3 or len(result) >= top_k:
+                        break
         return result
 
-    def _get_time_span(self, values):
-        """计算时间跨度"""
-        if values:
-            datetime_values = [convert_date_string(v) for v in values if convert_date_string(v) is not None]
-            if datetime_values:
-                min_time = min(datetime_values)
-                max_time = max(datetime_values)
-                time_diff = max_time - min_time
-                return f"{time_diff.days} days"
-        return None
+    def _parse_time_values(self, values):
+        """
+        一次性解析时间列，相同的原始值只解析一次 (日期列通常重复度很高)。
+        保留原有两套规则：
+          - 时间跨度: 全部使用 convert_date_string
+          - 最早/最晚时间: 含 "T" 的字符串使用 isoparse，date/datetime 对象直接使用，其余类型忽略
+
+        :return: (span_values, attr_values) 两个已过滤掉解析失败项的列表
+        """
+        cache = {}
+        span_values = []
+        attr_values = []
 
-    def _calculate_time_attributes(self, values):
-        """计算最早和最晚时间"""
-        parsed_values = []
         for v in values:
-            if isinstance(v, str):
-                if "T" in v:
-                    try:
-                        parsed = parser.isoparse(v)
-                    except ValueError:
-                        parsed = None
-                else:
-                    parsed = convert_date_string(v)
-            elif isinstance(v, datetime) or isinstance(v, date):
-                parsed = v
+            # 键中带上类型：1 / True / 1.0 哈希相同，但 str() 后的解析结果不同
+            key = (type(v), v)
+            if key in cache:
+                span_parsed, attr_parsed = cache[key]
             else:
-                parsed = None
-
-            if parsed:
-                parsed_values.append(parsed)
+                if isinstance(v, str):
+                    if "T" in v:
+                        # convert_date_string 不支持 "T" 分隔格式，跨度计算中一直为 None
+                        span_parsed = None
+                        try:
+                            attr_parsed = parser.isoparse(v)
+                        except ValueError:
+                            attr_parsed = None
+                    else:
+                        span_parsed = attr_parsed = convert_date_string(v)
+                else:
+                    span_parsed = convert_date_string(v)
+                    attr_parsed = v if isinstance(v, (datetime, date)) else None
+                cache[key] = (span_parsed, attr_parsed)
+
+            if span_parsed is not None:
+                span_values.append(span_parsed)
+            if attr_parsed:
+                attr_values.append(attr_parsed)
+
+        return span_values, attr_values
+
+    def _get_time_span(self, datetime_values):
+        """计算时间跨度 (输入为已解析的时间值)"""
+        if datetime_values:
+            min_time = min(datetime_values)
+            max_time = max(datetime_values)
+            time_diff = max_time - min_time
+            return f"{time_diff.days} days"
+        return None
 
+    def _calculate_time_attributes(self, parsed_values):
+        """计算最早和最晚时间 (输入为已解析的时间值)"""
         if parsed_values:
             def format_value(value):
                 # 只有 date 且不是 datetime 时才只返回日期部分
@@ -1,6 +1,6 @@
 import csv
 import os
-import chardet
+from chardet.universaldetector import UniversalDetector
 
 
 class MetadataManager:
@@ -13,6 +13,8 @@ class MetadataManager:
         self.database_file = database_file
         # 获取 database_file 的目录部分
         self.base_dir = os.path.dirname(database_file)
+        # 按表缓存解析结果，同一张表的 CSV 只读取一次
+        self._desc_cache = {}
 
     def get_column_descriptions(self, table_name):
         """
@@ -21,6 +23,12 @@ class MetadataManager:
         :param table_name: 表名
         :return: 包含列描述信息的字典列表
         """
+        if table_name not in self._desc_cache:
+            self._desc_cache[table_name] = self._load_column_descriptions(table_name)
+        return self._desc_cache[table_name]
+
+    def _load_column_descriptions(self, table_name):
+        """实际读取并解析 CSV (未命中缓存时调用)"""
         # 特殊处理：sqlite_sequence 表直接返回空
         if table_name == "sqlite_sequence":
             return []
@@ -28,8 +36,6 @@ class MetadataManager:
         # 构造 CSV 文件路径：数据库同级目录/database_description/{table_name}.csv
         file_path = os.path.join(self.base_dir, "database_description", f"{table_name}.csv")
 
-        column_descriptions = []
-
         if not os.path.exists(file_path):
             # 原代码逻辑：文件不存在时直接返回空列表 (曾有一行print被原作者注释掉了)
             return []
@@ -57,12 +63,19 @@ class MetadataManager:
             print(f"读取 CSV 文件异常: {e}, 文件: {file_path}")
             return []
 
-    def _detect_encoding(self, file_path):
-        """使用 chardet 检测文件编码"""
+    def _detect_encoding(self, file_path, chunk_size=8192):
+        """
+        使用 chardet 的 UniversalDetector 增量检测文件编码。
+        按块喂入数据，检测器有足够把握时 (done) 即提前结束，无需读入整个文件。
+        """
+        detector = UniversalDetector()
         with open(file_path, 'rb') as raw_file:
-            raw_data = raw_file.read()
-            result = chardet.detect(raw_data)
-            return result['encoding']
+            for chunk in iter(lambda: raw_file.read(chunk_size), b''):
+                detector.feed(chunk)
+                if detector.done:
+                    break
+        detector.close()
+        return detector.result['encoding']
 
     def _parse_csv_content(self, csvfile):
         """
@@ -2,6 +2,11 @@ import sqlite3
 import os
 
 
+def decode_text_lossy(raw):
+    """text_factory：以 UTF-8 解码 TEXT 值，忽略非法字节 (在 fetch 过程中由 sqlite3 直接调用)"""
+    return raw.decode('utf-8', errors='ignore')
+
+
 def quote_identifier(identifier):
     """
     引用标识符（表名或列名），防止包含空格或特殊字符时出错。
@@ -22,14 +27,30 @@ class SQLiteHandler:
         self.conn = None
         self.cursor = None
 
+        # PRAGMA 结果缓存 (按表名)，连接期间 schema 不变，每张表只查询一次
+        self._cols_cache = {}
+        self._fks_cache = {}
+        # 由缓存派生的列名索引：{table: {col_name: info}} / {table: {from_col, ...}}
+        self._col_index = {}
+        self._fk_col_index = {}
+
     def __enter__(self):
         """
         进入上下文管理器：建立连接
         """
         # check_same_thread=False 允许在不同线程使用连接（虽然这里主要是单线程）
         # isolation_level=None 开启自动提交模式，避免事务锁死
-        self.conn = sqlite3.connect(self.database_file, check_same_thread=False)
+        # cached_statements 调大预编译语句缓存 (默认 128)，宽表逐列查询时避免重复解析 SQL
+        self.conn = sqlite3.connect(self.database_file, check_same_thread=False, cached_statements=512)
         self.cursor = self.conn.cursor()
+        # 只读场景的性能参数：64MB 页缓存 + 256MB mmap，临时结构放内存，并禁止写入
+        # 注意：不设置 journal_mode=WAL / PRAGMA optimize，二者都会改写源数据库文件
+        self.cursor.executescript(
+            "PRAGMA cache_size=-65536;"
+            "PRAGMA mmap_size=268435456;"
+            "PRAGMA temp_store=MEMORY;"
+            "PRAGMA query_only=ON;"
+        )
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -43,6 +64,14 @@ class SQLiteHandler:
 
         self.cursor = None
         self.conn = None
+        self._clear_schema_cache()
+
+    def _clear_schema_cache(self):
+        """清空 PRAGMA 缓存 (连接关闭时调用，下次连接重新读取)"""
+        self._cols_cache.clear()
+        self._fks_cache.clear()
+        self._col_index.clear()
+        self._fk_col_index.clear()
 
     def _ensure_connection(self):
         """
@@ -78,18 +107,71 @@ class SQLiteHandler:
             return None
 
     def get_columns_info(self, table_name):
-        """获取表的列元数据 (PRAGMA table_info)"""
+        """获取表的列元数据 (PRAGMA table_info，按表缓存)"""
         self._ensure_connection()
-        query = f"PRAGMA table_info({quote_identifier(table_name)})"
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        if table_name not in self._cols_cache:
+            query = f"PRAGMA table_info({quote_identifier(table_name)})"
+            self.cursor.execute(query)
+            self._cols_cache[table_name] = self.cursor.fetchall()
+        return self._cols_cache[table_name]
 
     def get_foreign_keys(self, table_name):
-        """获取表的外键信息 (PRAGMA foreign_key_list)"""
+        """获取表的外键信息 (PRAGMA foreign_key_list，按表缓存)"""
         self._ensure_connection()
-        query = f"PRAGMA foreign_key_list({quote_identifier(table_name)})"
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        if table_name not in self._fks_cache:
+            query = f"PRAGMA foreign_key_list({quote_identifier(table_name)})"
+            self.cursor.execute(query)
+            self._fks_cache[table_name] = self.cursor.fetchall()
+        return self._fks_cache[table_name]
+
+    def prefetch_schema(self):
+        """
+        一次查询预取所有表的列信息与外键信息，填充 PRAGMA 缓存。
+        借助 pragma_table_info / pragma_foreign_key_list 表值函数与 sqlite_master 联结，
+        代替逐表执行 PRAGMA；返回行的列顺序与对应 PRAGMA 完全一致。
+
+        表值函数需要 SQLite >= 3.16，不支持时静默跳过，由 get_columns_info 等按需逐表查询。
+        """
+        self._ensure_connection()
+        try:
+            tables = [r[0] for r in self.cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
+            col_rows = self.cursor.execute(
+                "SELECT m.name, p.cid, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk "
+                "FROM sqlite_master m JOIN pragma_table_info(m.name) p "
+                "WHERE m.type='table'").fetchall()
+            fk_rows = self.cursor.execute(
+                "SELECT m.name, f.id, f.seq, f.\"table\", f.\"from\", f.\"to\", "
+                "f.on_update, f.on_delete, f.\"match\" "
+                "FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f "
+                "WHERE m.type='table'").fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"预取 schema 失败，回退为逐表 PRAGMA 查询。错误: {e}")
+            return
+
+        cols_cache = {t: [] for t in tables}
+        fks_cache = {t: [] for t in tables}
+        for row in col_rows:
+            cols_cache[row[0]].append(row[1:])
+        for row in fk_rows:
+            fks_cache[row[0]].append(row[1:])
+
+        self._clear_schema_cache()
+        self._cols_cache.update(cols_cache)
+        self._fks_cache.update(fks_cache)
+
+    def _get_column_index(self, table_name):
+        """列名 -> table_info 行 (重名时与线性查找一样取第一条)"""
+        if table_name not in self._col_index:
+            self._col_index[table_name] = {
+                info[1]: info for info in reversed(self.get_columns_info(table_name))}
+        return self._col_index[table_name]
+
+    def _get_fk_column_index(self, table_name):
+        """外键列名集合"""
+        if table_name not in self._fk_col_index:
+            self._fk_col_index[table_name] = {fk[3] for fk in self.get_foreign_keys(table_name)}
+        return self._fk_col_index[table_name]
 
     def fetch_column_data(self, table_name, column_name, limit=None):
         """
@@ -100,70 +182,137 @@ class SQLiteHandler:
         """
         self._ensure_connection()
 
+        query = f"SELECT {quote_identifier(column_name)} FROM {quote_identifier(table_name)}"
+        params = ()
         if limit is not None:
-            query = f"SELECT {quote_identifier(column_name)} FROM {quote_identifier(table_name)} LIMIT {limit};"
-        else:
-            query = f"SELECT {quote_identifier(column_name)} FROM {quote_identifier(table_name)} ;"
-
-        all_values = []
+            query += " LIMIT ?"
+            params = (limit,)
 
         try:
             # 正常模式：text_factory 默认为 str
-            self.cursor.execute(query)
-            rows = self.cursor.fetchall()
-            all_values = [row[0] for row in rows]
+            self.cursor.execute(query, params)
+            return [row[0] for row in self.cursor.fetchall()]
 
         except sqlite3.OperationalError as e:
-            print(f"警告：读取 {table_name}.{column_name} 失败，切换 bytes 模式重试。错误: {e}")
+            print(f"警告：读取 {table_name}.{column_name} 失败，切换容错解码模式重试。错误: {e}")
 
             # 保存原本的 factory (通常是 str)
             original_factory = self.conn.text_factory
 
             try:
-                # 临时切换为 bytes 模式
-                self.conn.text_factory = bytes
-                # 需要重新获取 cursor 或者直接用 conn execute，为了保险起见重新 execute
-                self.cursor.execute(query)
-                rows = self.cursor.fetchall()
-
-                all_values = []
-                for row in rows:
-                    value = row[0]
-                    if isinstance(value, bytes):
-                        value = value.decode('utf-8', errors='ignore')
-                    all_values.append(value)
-
+                # 临时切换为容错解码模式：TEXT 值在取数时即被解码，无需再逐行判断类型
+                self.conn.text_factory = decode_text_lossy
+                self.cursor.execute(query, params)
+                return [row[0] for row in self.cursor.fetchall()]
             except Exception as e_fallback:
-                print(f"使用 bytes 方式重试依然失败: {e_fallback}")
+                print(f"容错解码模式重试依然失败: {e_fallback}")
                 return []
             finally:
                 # **必须恢复** text_factory，否则影响后续查询
                 self.conn.text_factory = original_factory
 
-        return all_values
+    def fetch_all_columns(self, table_name, column_names, limit=None):
+        """
+        单次查询读取表中多列的数据，并按列转置。
+        替代逐列调用 fetch_column_data，整张表只扫描一次。
+
+        :param column_names: 需要读取的列名列表
+        :return: {column_name: [values...]}
+        """
+        self._ensure_connection()
+
+        if not column_names:
+            return {}
+
+        columns_sql = ", ".join(quote_identifier(c) for c in column_names)
+        query = f"SELECT {columns_sql} FROM {quote_identifier(table_name)}"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+
+        columns = [[] for _ in column_names]
+
+        try:
+            # 正常模式：text_factory 默认为 str
+            self._collect_columns(self.conn.execute(query, params), columns)
+
+        except sqlite3.OperationalError as e:
+            print(f"警告：读取 {table_name} 失败，切换容错解码模式重试。错误: {e}")
+
+            # 保存原本的 factory (通常是 str)
+            original_factory = self.conn.text_factory
+
+            try:
+                # 临时切换为容错解码模式，从头重新读取
+                self.conn.text_factory = decode_text_lossy
+                columns = [[] for _ in column_names]
+                self._collect_columns(self.conn.execute(query, params), columns)
+            except Exception as e_fallback:
+                print(f"容错解码模式重试依然失败: {e_fallback}")
+                return {name: [] for name in column_names}
+            finally:
+                # **必须恢复** text_factory，否则影响后续查询
+                self.conn.text_factory = original_factory
+
+        return dict(zip(column_names, columns))
+
+    def get_integer_key_summary(self, table_name, column_name, limit=None, sample_size=6):
+        """
+        整数主键列的轻量统计：在 SQL 侧计算行数、最值并随机抽取样本，不把整列读入 Python。
+        仅当 (前 limit 行内) 所有值都是非空整数时返回结果，否则返回 None，由调用方走常规读取流程。
+
+        :return: {"count", "min", "max", "samples"} 或 None
+        """
+        self._ensure_connection()
+        column = quote_identifier(column_name)
+        source = f"SELECT {column} AS v FROM {quote_identifier(table_name)}"
+        params = ()
+        if limit is not None:
+            source += " LIMIT ?"
+            params = (limit,)
+
+        try:
+            total, integer_count, min_value, max_value = self.conn.execute(
+                f"SELECT COUNT(*), SUM(typeof(v) = 'integer'), MIN(v), MAX(v) FROM ({source})",
+                params).fetchone()
+            if not total or integer_count != total:
+                return None
+            samples = [row[0] for row in self.conn.execute(
+                f"SELECT v FROM ({source}) ORDER BY random() LIMIT ?", params + (sample_size,))]
+        except sqlite3.Error as e:
+            print(f"获取 {table_name}.{column_name} 主键统计失败，回退为逐行读取。错误: {e}")
+            return None
+
+        return {"count": total, "min": min_value, "max": max_value, "samples": samples}
+
+    @staticmethod
+    def _collect_columns(cursor, columns, chunk_size=1000):
+        """
+        按 fetchmany 分块读取结果集，并逐块转置追加到各列列表。
+        不再 fetchall 物化整张结果表，峰值内存只多出一个分块。
+        """
+        cursor.arraysize = chunk_size
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            # zip(*rows) 在 C 层完成行转列
+            for values, chunk in zip(columns, zip(*rows)):
+                values.extend(chunk)
 
     # --- 辅助判断方法 ---
 
     def is_primary_key(self, table_name, column_name):
-        columns_info = self.get_columns_info(table_name)
-        for column_info in columns_info:
-            if column_info[1] == column_name:
-                return bool(column_info[5])
-        return False
+        column_info = self._get_column_index(table_name).get(column_name)
+        return bool(column_info[5]) if column_info else False
 
     def is_foreign_key(self, table_name, column_name):
-        fks = self.get_foreign_keys(table_name)
-        for fk in fks:
-            if fk[3] == column_name:
-                return True
-        return False
+        return column_name in self._get_fk_column_index(table_name)
 
     def is_nullable(self, table_name, column_name):
-        columns_info = self.get_columns_info(table_name)
-        for column_info in columns_info:
-            if column_info[1] == column_name:
-                return not column_info[3]
-        return None
+        column_info = self._get_column_index(table_name).get(column_name)
+        return not column_info[3] if column_info else None
 
     def get_primary_key_columns(self, table_name):
         columns_info = self.get_columns_info(table_name)
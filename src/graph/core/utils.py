@@ -1,11 +1,61 @@
+import re
 import hashlib
+from functools import lru_cache
 from datetime import datetime, date
 
 
+# 与 datetime.strptime 内部 (_strptime.TimeRE) 完全一致的字段正则
+_DIRECTIVE_PATTERNS = {
+    'Y': r"(?P<Y>\d\d\d\d)",
+    'm': r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    'd': r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])",
+    'H': r"(?P<H>2[0-3]|[0-1]\d|\d)",
+    'M': r"(?P<M>[0-5]\d|\d)",
+    'S': r"(?P<S>6[0-1]|[0-5]\d|\d)",
+    'f': r"(?P<f>[0-9]{1,6})",
+}
+
+_DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%Y.%m.%d',
+    '%m/%d/%Y',
+    '%m-%d-%Y',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y.%m.%d %H:%M:%S',
+    '%m/%d/%Y %H:%M:%S',
+    '%m-%d-%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',  # 新增的日期时间格式
+    '%Y/%m/%d %H:%M:%S.%f',
+    '%Y.%m.%d %H:%M:%S.%f',
+    '%m/%d/%Y %H:%M:%S.%f',
+    '%m-%d-%Y %H:%M:%S.%f',
+    '%d/%m/%Y %H:%M:%S.%f',
+    '%d-%m-%Y %H:%M:%S.%f',
+    '%Y'  # 仅年份的格式
+]
+
+
+def _compile_date_format(format_str):
+    """按 strptime 的规则把格式串编译为正则：'.' 转义，空白匹配 \\s+，%X 替换为字段正则"""
+    pattern = re.sub(r'\s+', r'\\s+', format_str.replace('.', r'\.'))
+    pattern = re.sub(r'%(\w)', lambda m: _DIRECTIVE_PATTERNS[m.group(1)], pattern)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# 模块加载时一次性编译；未命中只是一次正则匹配失败，不再抛出/捕获 ValueError
+_DATE_REGEXES = [(_compile_date_format(f), '%H' in f) for f in _DATE_FORMATS]
+
+
 def convert_date_string(date_str):
     """
     尝试将输入的日期字符串按照多种常见格式转换为datetime对象或date对象。
-    完全保留原代码的格式列表和转换逻辑。
+    完全保留原代码的格式列表和转换逻辑 (格式按同样顺序尝试，匹配规则与 strptime 一致)。
     """
     # 检查 date_str 是否为字符串类型
     if not isinstance(date_str, str):
@@ -15,41 +65,32 @@ def convert_date_string(date_str):
             # print(f"无法将输入 {date_str} 转换为字符串类型，错误信息: {e}")
             return None
 
-    date_formats = [
-        '%Y-%m-%d',
-        '%Y/%m/%d',
-        '%Y.%m.%d',
-        '%m/%d/%Y',
-        '%m-%d-%Y',
-        '%d/%m/%Y',
-        '%d-%m-%Y',
-        '%Y-%m-%d %H:%M:%S',
-        '%Y/%m/%d %H:%M:%S',
-        '%Y.%m.%d %H:%M:%S',
-        '%m/%d/%Y %H:%M:%S',
-        '%m-%d-%Y %H:%M:%S',
-        '%d/%m/%Y %H:%M:%S',
-        '%d-%m-%Y %H:%M:%S',
-        '%Y-%m-%d %H:%M:%S.%f',  # 新增的日期时间格式
-        '%Y/%m/%d %H:%M:%S.%f',
-        '%Y.%m.%d %H:%M:%S.%f',
-        '%m/%d/%Y %H:%M:%S.%f',
-        '%m-%d-%Y %H:%M:%S.%f',
-        '%d/%m/%Y %H:%M:%S.%f',
-        '%d-%m-%Y %H:%M:%S.%f',
-        '%Y'  # 仅年份的格式
-    ]
-    for format_str in date_formats:
+    return _parse_date_str(date_str)
+
+
+@lru_cache(maxsize=100_000)
+def _parse_date_str(date_str):
+    """按格式列表解析字符串 (结果按字符串缓存：日期列重复值多，相同字符串只解析一次)"""
+    for regex, has_time in _DATE_REGEXES:
+        # 与 strptime 相同：从开头匹配，且必须消费完整个字符串
+        found = regex.match(date_str)
+        if found is None or found.end() != len(date_str):
+            continue
+        fields = found.groupdict()
         try:
-            dt = datetime.strptime(date_str, format_str)
-            # 如果格式是纯日期（没有时间部分），返回 date 对象
-            if format_str in ['%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y']:
-                if format_str == '%Y':
-                    # 对于仅年份的格式，将其转换为该年的 1 月 1 日
-                    return date(dt.year, 1, 1)
-                return dt.date()
-            return dt
+            year = int(fields['Y'])
+            # 仅年份的格式，将其转换为该年的 1 月 1 日
+            month = int(fields.get('m') or 1)
+            day = int(fields.get('d') or 1)
+            if not has_time:
+                # 纯日期格式（没有时间部分），返回 date 对象
+                return date(year, month, day)
+            fraction = fields.get('f') or ''
+            return datetime(year, month, day,
+                            int(fields['H']), int(fields['M']), int(fields['S']),
+                            int(fraction.ljust(6, '0')) if fraction else 0)
         except ValueError:
+            # 字段越界 (如 2 月 30 日)，与 strptime 一样继续尝试下一个格式
             continue
     return None
 
@@ -58,6 +99,15 @@ def generate_fk_hash(table1, column1, table2, column2):
     """
     生成无序的外键ID，用于唯一标识外键关系。
     """
-    elements = sorted([f"{table1}.{column1}", f"{table2}.{column2}"])
-    unique_string = "|".join(elements)
-    return hashlib.md5(unique_string.encode()).hexdigest()
+    # 直接对字节串排序并分段喂给 hasher，省去列表排序与 join 的中间字符串
+    # (UTF-8 字节序与码点序一致，结果与 "|".join(sorted([...])) 完全相同)
+    a = f"{table1}.{column1}".encode()
+    b = f"{table2}.{column2}".encode()
+    if a > b:
+        a, b = b, a
+    # 保持 md5：已生成的图 (output/ 与转换后的 pkl) 均以 md5 值作为外键标识
+    hasher = hashlib.md5()
+    hasher.update(a)
+    hasher.update(b'|')
+    hasher.update(b)
+    return hasher.hexdigest()
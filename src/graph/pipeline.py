@@ -1,21 +1,158 @@
 import os
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 import networkx as nx
 from tqdm import tqdm
 from core import SQLiteHandler, DataProfiler, MetadataManager, GraphBuilder
 from configs import paths
 
 
+def profile_table(db, table_name, profiler, metadata_manager):
+    """
+    处理单张表：读取表/列元数据并分析列数据，返回构建图所需的属性。
+    以模块级函数实现，串行时直接使用 run() 中已打开 (并预取了 schema) 的连接，
+    并行时由工作进程各自持有的连接调用 (见 _init_worker)；NetworkX 图本身只在主进程中写入。
+
+    :param db: 已打开的 SQLiteHandler
+    :return: (table_props, column_entries)，
+             column_entries 为 [(col_name, is_pk, is_fk, final_props), ...]
+    """
+    # 获取表级元数据
+    row_count = db.get_row_count(table_name)
+    pk_columns = db.get_primary_key_columns(table_name)
+    fk_columns = db.get_foreign_key_columns(table_name)
+    columns_info = db.get_columns_info(table_name)
+    all_columns = [info[1] for info in columns_info]
+
+    # 构建表属性 (保留原逻辑)
+    table_props = {
+        "row_count": row_count,
+        "column_count": len(all_columns),
+        "columns": all_columns,
+        "database_name": db.get_database_name()
+    }
+
+    # 如果有主外键，添加相应属性
+    if pk_columns:
+        table_props["primary_key"] = pk_columns if len(pk_columns) > 1 else pk_columns[0]
+    if fk_columns:
+        table_props["foreign_key"] = fk_columns if len(fk_columns) > 1 else fk_columns[0]
+
+    # --- 处理列 (Column Nodes) ---
+    # 获取 CSV 描述文件中的元数据
+    csv_descriptions = metadata_manager.get_column_descriptions(table_name)
+    # 按列名建立索引 (倒序构建，重名时与原先的线性查找一样取第一条)
+    desc_by_col = {d['original_column_name']: d for d in reversed(csv_descriptions)}
+
+    # 列级元数据按表预先建索引，避免在列循环中反复执行 PRAGMA (O(C²) -> O(C))
+    # columns_info 结构: (cid, name, type, notnull, dflt_value, pk)
+    col_type_map = {info[1]: info[2] for info in columns_info}
+    nullable_map = {info[1]: not info[3] for info in columns_info}
+    pk_set = set(pk_columns)
+    is_single_pk = len(pk_columns) == 1
+    fk_set = set(fk_columns)
+
+    # A. 提取数据 (包含重试逻辑)
+    # 规则：行数>10万则截断读取，否则全量读取 (保留原逻辑)
+    # 整张表一次查询读出所有列，避免每列各扫描一次表
+    limit = 100000 if row_count > 100000 else None
+
+    # 单列整数主键 (通常是 rowid 别名) 只需完整性/样本/范围，直接在 SQL 侧统计，不读入整列
+    key_props = {}
+    if is_single_pk:
+        pk_column = pk_columns[0]
+        pk_type = col_type_map.get(pk_column, "UNKNOWN")
+        # 先按声明类型过滤，非数值主键 (如 TEXT 编码) 不发起汇总查询
+        if pk_type.split('(')[0].upper() in profiler.numeric_types:
+            summary = db.get_integer_key_summary(table_name, pk_column, limit=limit)
+            if summary is not None:
+                props = profiler.profile_integer_key(pk_type, summary)
+                if props is not None:
+                    key_props[pk_column] = props
+
+    col_data = db.fetch_all_columns(
+        table_name, [c for c in all_columns if c not in key_props], limit=limit)
+
+    column_entries = []
+    for col_name in all_columns:
+        # B. 获取元数据状态
+        curr_col_type = col_type_map.get(col_name, "UNKNOWN")
+
+        is_pk = col_name in pk_set
+        is_fk = col_name in fk_set
+        is_nullable = nullable_map.get(col_name)
+
+        # C. 数据分析 (Data Profiling)
+        # 计算 samples, mean, mode, word_freq 等
+        # 单列主键取值唯一，众数/词频/类别等统计没有意义，只做轻量分析 (完整性、样本、数值范围)
+        if col_name in key_props:
+            profile_props = key_props[col_name]
+        else:
+            profile_props = profiler.profile_stream(
+                col_data[col_name], curr_col_type, col_name, light=is_single_pk and is_pk)
+
+        # D. 合并属性
+        # 基础属性
+        final_props = {
+            "data_type": curr_col_type,
+            "is_nullable": is_nullable,
+            **profile_props  # 展开统计属性
+        }
+
+        # 融合 CSV 描述 (如果有)
+        # 查找当前列是否有 CSV 描述
+        matching_desc = desc_by_col.get(col_name)
+        if matching_desc:
+            if matching_desc.get("column_description"):
+                final_props["column_description"] = matching_desc["column_description"].replace('\n', '')
+            if matching_desc.get("value_description"):
+                final_props["value_description"] = matching_desc["value_description"]
+
+        column_entries.append((col_name, is_pk, is_fk, final_props))
+
+    return table_props, column_entries
+
+
+# 工作进程内的状态：由 _init_worker 在每个进程启动时设置一次
+_worker_state = {}
+
+
+def _init_worker(database_path, profiler, metadata_manager):
+    """
+    进程池 initializer：每个工作进程只打开一次 SQLite 连接 (并预取 schema)，
+    profiler / metadata_manager 也只反序列化一次，进程内处理的各张表共用 (包括 CSV 描述缓存)。
+    连接通过 multiprocessing 的 Finalize 注册关闭：fork 出的工作进程以 os._exit 退出，
+    不会执行 atexit，而 Finalize 会在进程正常退出前调用。
+    """
+    db = SQLiteHandler(database_path).__enter__()
+    Finalize(db, db.__exit__, args=(None, None, None), exitpriority=10)
+    db.prefetch_schema()
+    _worker_state.update(db=db, profiler=profiler, metadata_manager=metadata_manager)
+
+
+def _profile_table_in_worker(table_name):
+    return profile_table(_worker_state["db"], table_name,
+                         _worker_state["profiler"], _worker_state["metadata_manager"])
+
+
 class SchemaPipeline:
-    def __init__(self, database_path, output_path):
+    # 表数达到该值时才会启用进程池：BIRD/Spider 的库大多只有少量小表，
+    # 进程池启动 (Windows 上为 spawn) 的开销会超过分析本身
+    PARALLEL_MIN_TABLES = 16
+
+    def __init__(self, database_path, output_path, max_workers=1):
         """
         初始化 Pipeline。
 
         :param database_path: SQLite 数据库源文件路径
         :param output_path: 结果图存储路径 (建议以 .pkl 结尾)
+        :param max_workers: 并行分析表的进程数，默认 1 (在当前进程串行执行)；
+                            大于 1 且表数不少于 PARALLEL_MIN_TABLES 时才使用进程池
         """
         self.database_path = database_path
         self.output_path = output_path
+        self.max_workers = max_workers or 1
 
         # 初始化各个组件
         # 注意：SQLiteHandler 在 run() 中通过 with 上下文使用，此处不实例化连接
@@ -32,86 +169,30 @@ class SchemaPipeline:
         # 1. 使用上下文管理器确保 SQLite 连接安全闭合
         with SQLiteHandler(self.database_path) as db:
 
-            # --- 阶段 1: 处理表 (Table Nodes) ---
+            # --- 阶段 1 & 2: 处理表与列 (Table / Column Nodes) ---
             tables = db.get_all_tables()
             print(f"Found {len(tables)} tables.")
+            # 一次性预取所有表的列/外键元数据，外键阶段不再逐表执行 PRAGMA
+            db.prefetch_schema()
 
-            for table_name in tqdm(tables, desc="Processing Tables"):
-                # 获取表级元数据
-                row_count = db.get_row_count(table_name)
-                pk_columns = db.get_primary_key_columns(table_name)
-                fk_columns = db.get_foreign_key_columns(table_name)
-                all_columns = [info[1] for info in db.get_columns_info(table_name)]
-
-                # 构建表属性 (保留原逻辑)
-                table_props = {
-                    "row_count": row_count,
-                    "column_count": len(all_columns),
-                    "columns": all_columns,
-                    "database_name": db.get_database_name()
-                }
-
-                # 如果有主外键，添加相应属性
-                if pk_columns:
-                    table_props["primary_key"] = pk_columns if len(pk_columns) > 1 else pk_columns[0]
-                if fk_columns:
-                    table_props["foreign_key"] = fk_columns if len(fk_columns) > 1 else fk_columns[0]
-
-                # 在图中创建表节点
-                self.builder.add_table_node(table_name, **table_props)
-
-                # --- 阶段 2: 处理列 (Column Nodes) ---
-                # 获取 CSV 描述文件中的元数据
-                csv_descriptions = self.metadata_manager.get_column_descriptions(table_name)
-
-                for col_name in all_columns:
-                    # A. 提取数据 (包含重试逻辑)
-                    # 规则：行数>10万则截断读取，否则全量读取 (保留原逻辑)
-                    limit = 100000 if row_count > 100000 else None
-                    raw_data = db.fetch_column_data(table_name, col_name, limit=limit)
-
-                    # B. 获取元数据状态
-                    col_info = db.get_columns_info(table_name)
-                    # 从 info 中找到对应列的 type
-                    curr_col_type = next((c[2] for c in col_info if c[1] == col_name), "UNKNOWN")
-
-                    is_pk = db.is_primary_key(table_name, col_name)
-                    is_fk = db.is_foreign_key(table_name, col_name)
-                    is_nullable = db.is_nullable(table_name, col_name)
-
-                    # C. 数据分析 (Data Profiling)
-                    # 计算 samples, mean, mode, word_freq 等
-                    profile_props = self.profiler.profile(raw_data, curr_col_type, col_name)
-
-                    # D. 合并属性
-                    # 基础属性
-                    final_props = {
-                        "data_type": curr_col_type,
-                        "is_nullable": is_nullable,
-                        **profile_props  # 展开统计属性
-                    }
-
-                    # 融合 CSV 描述 (如果有)
-                    # 查找当前列是否有 CSV 描述
-                    matching_desc = next((d for d in csv_descriptions if d['original_column_name'] == col_name), None)
-                    if matching_desc:
-                        if matching_desc.get("column_description"):
-                            final_props["column_description"] = matching_desc["column_description"].replace('\n', '')
-                        if matching_desc.get("value_description"):
-                            final_props["value_description"] = matching_desc["value_description"]
-
-                    # E. 写入图
-                    self.builder.add_column_node(
-                        table_name,
-                        col_name,
-                        is_primary_key=is_pk,
-                        is_foreign_key=is_fk,
-                        **final_props
-                    )
+            # 默认串行：复用当前连接 (含预取的 schema 元数据) 与同一个 profiler / metadata_manager；
+            # 表较多且显式指定 max_workers > 1 时，交给进程池并行分析，结果按表顺序回到主进程写入图
+            workers = min(self.max_workers, len(tables))
+            if workers > 1 and len(tables) >= self.PARALLEL_MIN_TABLES:
+                with ProcessPoolExecutor(
+                        max_workers=workers, initializer=_init_worker,
+                        initargs=(self.database_path, self.profiler, self.metadata_manager)) as pool:
+                    self._add_table_results(tables, pool.map(_profile_table_in_worker, tables))
+            else:
+                self._add_table_results(tables, (
+                    profile_table(db, table_name, self.profiler, self.metadata_manager)
+                    for table_name in tables))
 
             # --- 阶段 3: 处理外键关系 (Edges) ---
             # 必须在所有节点创建完后进行，否则引用计数可能不准确
             print("Processing Foreign Keys...")
+            # 目标表主键缓存：同一目标表被多个外键引用时只查询一次 PRAGMA
+            pk_map = {}
             for table_name in tables:
                 fks = db.get_foreign_keys(table_name)
                 # fks 结构: (id, seq, table, from, to, ...)
@@ -122,7 +203,9 @@ class SchemaPipeline:
 
                     # 如果目标列是 None (SQLite 特性)，尝试推断为主键
                     if to_column is None:
-                        target_pks = db.get_primary_key_columns(to_table)
+                        if to_table not in pk_map:
+                            pk_map[to_table] = db.get_primary_key_columns(to_table)
+                        target_pks = pk_map[to_table]
                         if target_pks:
                             to_column = target_pks[0]  # 假设单主键
 
@@ -134,10 +217,30 @@ class SchemaPipeline:
                             to_column=to_column
                         )
 
+            # 外键引用列表批量写回节点
+            self.builder.finalize()
+
         # 4. 保存图结构
         self.builder.save_graph(self.output_path)
         print(f"Pipeline completed. Schema graph saved to {self.output_path}")
 
+    def _add_table_results(self, tables, results):
+        """将 profile_table 的结果写入图 (仅在主进程调用，NetworkX 非线程/进程安全)"""
+        for table_name, (table_props, column_entries) in zip(
+                tables, tqdm(results, total=len(tables), desc="Processing Tables")):
+            # 在图中创建表节点
+            self.builder.add_table_node(table_name, **table_props)
+
+            # E. 写入列节点
+            for col_name, is_pk, is_fk, final_props in column_entries:
+                self.builder.add_column_node(
+                    table_name,
+                    col_name,
+                    is_primary_key=is_pk,
+                    is_foreign_key=is_fk,
+                    **final_props
+                )
+
     @staticmethod
     def load_graph(path):
         """
@@ -5,6 +5,8 @@ import os
 import json
 import pandas as pd
 import pickle
+import heapq
+from operator import itemgetter
 from configs import paths
 
 # ==========================================
@@ -43,6 +45,38 @@ STYLE = {
     }
 }
 
+# STYLE 按类型预先展开为元组，构建图元素时每个节点/边只需一次查找
+# 节点: (color, font, widthConstraint, heightConstraint)，嵌套 dict 按类型只构建一次、在同类节点间共享
+# (Node 只读取这些属性做序列化，不会修改)；边: (color, width, dashes)
+def _node_style(conf):
+    # 直径尺寸 (size 代表直径)
+    diameter = conf.get("size", 30)
+    return (
+        conf.get("color"),
+        {"color": conf.get("font_color"), "size": conf.get("font_size"), "face": "arial"},
+        {"minimum": diameter, "maximum": diameter},
+        {"minimum": diameter, "maximum": diameter},
+    )
+
+
+_NODE_STYLE_FAST = {t: _node_style(s) for t, s in STYLE.items()}
+_DEFAULT_NODE_STYLE = _node_style({})
+_EDGE_STYLE_FAST = {t: (s.get("color"), s.get("width"), s.get("dashes", False)) for t, s in STYLE.items()}
+_DEFAULT_EDGE_STYLE = (None, None, False)
+# 所有节点/边共用的阴影与箭头配置
+_NODE_SHADOW = {"enabled": True, "color": "rgba(0,0,0,0.3)", "size": 5, "x": 2, "y": 2}
+_EDGE_ARROWS = {"to": {"enabled": True, "scaleFactor": 0.8}}
+
+# 属性表 (_build_compact_table) 的样式
+PROP_TABLE_STYLE = """
+<style>
+    .prop-table { width: 100%; border-collapse: collapse; font-size: 13px; font-family: sans-serif; }
+    .prop-table td { padding: 5px 8px; border-bottom: 1px solid #eee; vertical-align: top;}
+    .prop-key { color: #555; font-weight: 600; width: 40%; white-space: nowrap; }
+    .prop-val { color: #222; font-family: monospace; word-break: break-all; }
+</style>
+"""
+
 
 # ==========================================
 # 1. 工具函数
@@ -61,14 +95,73 @@ def smart_truncate(content, length=8):
     return s[:length] + ".."
 
 
-@st.cache_data
+def _file_version(pkl_path):
+    """文件的 (修改时间, 大小)，作为缓存键的一部分；文件不可访问时返回 None"""
+    try:
+        stat = os.stat(pkl_path)
+    except OSError as e:
+        st.error(f"文件加载失败: {e}")
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 def load_graph_from_pkl(pkl_path):
+    """
+    读取图文件。缓存键带上文件的修改时间与大小：
+    同一路径的 .pkl 被重新生成后会重新加载，内容未变时直接复用缓存。
+    """
+    version = _file_version(pkl_path)
+    if version is None:
+        return None
+    return _load_graph_cached(pkl_path, *version)
+
+
+# 图只读不写，用 cache_resource 直接复用同一对象，避免 cache_data 每次重跑都反序列化一份副本
+@st.cache_resource(show_spinner=False)
+def _load_graph_cached(pkl_path, mtime_ns, size):
     try:
         with open(pkl_path, "rb") as f:
-            return pickle.load(f)
+            G = pickle.load(f)
     except Exception as e:
         st.error(f"文件加载失败: {e}")
         return None
+    _prepare_graph(G)
+    return G
+
+
+def _prepare_graph(G):
+    """
+    图加载后 (已缓存) 一次性预计算渲染所需的派生数据，存放在 G.graph 中，
+    不写入节点属性，避免出现在属性面板里。
+    """
+    # 节点 Label (截断后) 与 Tooltip：两种显示模式共用，不再在构建图元素时逐个计算
+    G.graph["_node_display"] = _compute_node_display(G)
+    # 非列节点列表 (保持图中的节点顺序)：仅看表关系时直接使用，不再每次扫描全部节点
+    G.graph["_non_column_nodes"] = _non_column_nodes(G)
+    # word_frequency 在图中以 JSON 字符串存储，加载时统一解析为 dict，点击节点时不再重复 json.loads
+    for _, attrs in G.nodes(data=True):
+        wf = attrs.get("word_frequency")
+        if isinstance(wf, str):
+            try:
+                attrs["word_frequency"] = json.loads(wf)
+            except ValueError:
+                attrs["word_frequency"] = {}
+
+
+def _non_column_nodes(G):
+    return [n for n, t in G.nodes(data="type") if t != "Column"]
+
+
+def _compute_node_display(G):
+    """node_id -> (截断后的 label, tooltip)"""
+    display = {}
+    for node_id, attrs in G.nodes(data=True):
+        node_type = attrs.get("type", "Unknown")
+        real_name = attrs.get("name", node_id)
+        # 截断长度根据节点类型区分
+        truncate_len = 8 if node_type == "Column" else 10
+        display[node_id] = (smart_truncate(real_name, truncate_len), f"Name: {real_name}\nType: {node_type}")
+    return display
 
 
 # ==========================================
@@ -117,55 +210,59 @@ def render_sidebar():
 # 3. 图转换逻辑 (【修改点】支持美观圆形和边ID)
 # ==========================================
 def convert_nx_to_agraph(G, show_columns):
-    nodes = []
     edges = []
     # 【修改点2】新增 edge_map 用于存储边数据以便点击时查询
     edge_map = {}
 
-    for node_id, attrs in G.nodes(data=True):
-        node_type = attrs.get("type", "Unknown")
-
-        if not show_columns and node_type == "Column":
-            continue
-
-        conf = STYLE.get(node_type, {})
-        real_name = attrs.get("name", node_id)
-
-        # 截断长度根据节点类型区分
-        truncate_len = 8 if node_type == "Column" else 10
-        label_text = smart_truncate(real_name, truncate_len)
-
-        # 获取直径尺寸
-        diameter = conf.get("size", 30)
+    if show_columns:
+        node_iter = G.nodes(data=True)
+        edge_iter = G.edges(data=True)
+    else:
+        # 仅看表关系时只遍历 Table 节点及其出边，不再逐个遍历并过滤全部列节点/HAS_COLUMN 边
+        # (G.edges(nbunch) 按节点顺序产出，与全量遍历后过滤的顺序一致)
+        table_nodes = G.graph.get("_non_column_nodes")
+        if table_nodes is None:
+            table_nodes = _non_column_nodes(G)
+        # 目标端是否为列节点改为集合成员判断，不再对每条边查 G.nodes[v] 属性
+        table_node_set = set(table_nodes)
+        node_iter = ((n, G.nodes[n]) for n in table_nodes)
+        edge_iter = (
+            (u, v, attrs) for u, v, attrs in G.edges(table_nodes, data=True)
+            if v in table_node_set and attrs.get("type") != "HAS_COLUMN"
+        )
 
-        nodes.append(Node(
+    # Label / Tooltip 已在加载图时预计算 (见 _prepare_graph)；未经预处理的图在此现算
+    node_display = G.graph.get("_node_display")
+    if node_display is None:
+        node_display = _compute_node_display(G)
+
+    node_specs = (
+        (node_id, node_display[node_id], _NODE_STYLE_FAST.get(attrs.get("type", "Unknown"), _DEFAULT_NODE_STYLE))
+        for node_id, attrs in node_iter
+    )
+    nodes = [
+        Node(
             id=node_id,
             label=label_text,
             # 【修改点1】使用 ellipse 配合严格的宽高约束来实现“文字在内的完美圆形”
             shape="ellipse",
-            widthConstraint={"minimum": diameter, "maximum": diameter},
-            heightConstraint={"minimum": diameter, "maximum": diameter},
-            color=conf.get("color"),
-            font={
-                "color": conf.get("font_color"),
-                "size": conf.get("font_size"),
-                "face": "arial"
-            },
-            title=f"Name: {real_name}\nType: {node_type}",  # Tooltip
+            widthConstraint=width_constraint,
+            heightConstraint=height_constraint,
+            color=color,
+            font=font,
+            title=tooltip,  # Tooltip
             borderWidth=1,
             borderWidthSelected=3,
             # 添加阴影增加立体感，稍微美化一下
-            shadow={"enabled": True, "color": "rgba(0,0,0,0.3)", "size": 5, "x": 2, "y": 2}
-        ))
+            shadow=_NODE_SHADOW
+        )
+        for node_id, (label_text, tooltip), (color, font, width_constraint, height_constraint) in node_specs
+    ]
 
-    for u, v, attrs in G.edges(data=True):
+    for u, v, attrs in edge_iter:
         edge_type = attrs.get("type")
 
-        if not show_columns:
-            if edge_type == "HAS_COLUMN": continue
-            if G.nodes[u].get("type") == "Column" or G.nodes[v].get("type") == "Column": continue
-
-        conf = STYLE.get(edge_type, {})
+        color, width, dashes = _EDGE_STYLE_FAST.get(edge_type, _DEFAULT_EDGE_STYLE)
 
         # 【修改点2】生成唯一的边 ID
         edge_id = f"{u}___{v}___{edge_type}"
@@ -176,17 +273,36 @@ def convert_nx_to_agraph(G, show_columns):
             id=edge_id,  # 设置 ID
             source=u,
             target=v,
-            color=conf.get("color"),
-            width=conf.get("width"),
-            dashes=conf.get("dashes", False),
+            color=color,
+            width=width,
+            dashes=dashes,
             # 增加箭头大小
-            arrows={"to": {"enabled": True, "scaleFactor": 0.8}}
+            arrows=_EDGE_ARROWS
         ))
 
     # 【修改点2】返回 nodes, edges 和 edge_map
     return nodes, edges, edge_map
 
 
+def build_agraph_elements(pkl_path, show_columns):
+    """
+    带缓存的 convert_nx_to_agraph：以 (文件路径, 文件版本, show_columns) 为键，
+    点击节点/边触发的重跑直接复用已构建的 nodes / edges / edge_map。
+    """
+    version = _file_version(pkl_path)
+    if version is None:
+        return [], [], {}
+    return _build_agraph_cached(pkl_path, *version, show_columns)
+
+
+@st.cache_resource(show_spinner=False)
+def _build_agraph_cached(pkl_path, mtime_ns, size, show_columns):
+    G = _load_graph_cached(pkl_path, mtime_ns, size)
+    if G is None:
+        return [], [], {}
+    return convert_nx_to_agraph(G, show_columns)
+
+
 # ==========================================
 # 4. 详情面板 (【修改点】支持边点击展示)
 # ==========================================
@@ -197,51 +313,59 @@ def render_details_panel(G, edge_map, selected_id):
         st.info("👈 选择节点或关系查看详情")
         return
 
+    # 选中元素未变化的重跑 (如拖动画布) 直接复用上次构建的面板内容，只重新输出；
+    # 图与 edge_map 均为缓存对象，用 is 判断是否仍是同一份数据
+    cached = st.session_state.get("_details_panel")
+    if cached is not None and cached[0] is G and cached[1] is edge_map and cached[2] == selected_id:
+        panel = cached[3]
+    else:
+        panel = _build_details_panel(G, edge_map, selected_id)
+        st.session_state["_details_panel"] = (G, edge_map, selected_id, panel)
+
+    _emit_details_panel(panel)
+
+
+def _build_details_panel(G, edge_map, selected_id):
+    """构建属性面板内容 (HTML 片段与 DataFrame)，不输出任何元素"""
     # --- 情况 A: 点击的是节点 ---
     if G.has_node(selected_id):
         data = G.nodes[selected_id]
         node_type = data.get('type', 'N/A')
         node_name = data.get('name', selected_id)
-        st.write(data)
+        panel = {"kind": "node", "data": data}
 
         # 1. 顶部卡片
         bg_color = STYLE.get(node_type, {}).get('color', '#555')
-        st.markdown(f"""
+        panel["card"] = f"""
         <div style="padding:12px; border-radius:6px; background-color:{bg_color}; color:white; margin-bottom: 15px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">
             <h3 style="margin:0; font-size: 20px; font-family: monospace;">{node_name}</h3>
             <div style="margin-top:4px; font-size: 12px; opacity: 0.9; text-transform: uppercase; letter-spacing: 1px;">{node_type} Node</div>
         </div>
-        """, unsafe_allow_html=True)
+        """
 
         # 2. 统计信息列表 (复用 HTML Table 逻辑)
-        _render_compact_table(data, ignore_keys={'type', 'name', 'samples', 'word_frequency', 'columns', 'foreign_key',
-                                                 'reference_to', 'referenced_by', 'referenced_to', 'id'})
+        panel["table"] = _build_compact_table(data, ignore_keys=_IGNORE_NODE_KEYS)
 
         # 3. 采样数据 & 词频 & 结构 (保持不变)
+        panel["samples"] = None
         if "samples" in data and data["samples"]:
-            st.markdown("---")
-            st.markdown("**🎲 采样数据**")
-            df_samples = pd.DataFrame(data["samples"], columns=["Values"])
-            st.dataframe(df_samples, height=150, hide_index=True, use_container_width=True)
+            panel["samples"] = pd.DataFrame(data["samples"], columns=["Values"])
 
+        panel["word_frequency"] = None
         if "word_frequency" in data:
+            # 已在加载图时解析为 dict (见 _prepare_graph)
             wf = data["word_frequency"]
-            if isinstance(wf, str):
-                try:
-                    wf = json.loads(wf)
-                except:
-                    wf = {}
             if wf and isinstance(wf, dict):
-                st.markdown("---")
-                st.markdown("**🔡 高频词汇**")
-                df_wf = pd.DataFrame(list(wf.items()), columns=["Word", "Freq"])
-                df_wf = df_wf.sort_values(by="Freq", ascending=False).head(10)
-                st.dataframe(df_wf, height=150, hide_index=True, use_container_width=True)
+                # 只取频次最高的 10 项 (堆选取 O(N log 10))，再用这 10 行构建 DataFrame
+                top_words = heapq.nlargest(10, wf.items(), key=itemgetter(1))
+                df_wf = pd.DataFrame(top_words, columns=["Word", "Freq"])
+                # st.table 不支持隐藏索引，以词作为行索引展示
+                panel["word_frequency"] = df_wf.set_index("Word")
 
+        panel["columns"] = None
         if node_type == "Table" and "columns" in data:
-            st.markdown("---")
-            with st.expander(f"包含列 ({len(data['columns'])})", expanded=False):
-                st.write(", ".join(data['columns']))
+            panel["columns"] = (len(data['columns']), ", ".join(data['columns']))
+        return panel
 
     # --- 【修改点3】情况 B: 点击的是边 ---
     elif selected_id in edge_map:
@@ -250,52 +374,96 @@ def render_details_panel(G, edge_map, selected_id):
 
         # 1. 顶部卡片 (边的样式)
         bg_color = STYLE.get(edge_type, {}).get('color', '#999')
-        st.markdown(f"""
+        card = f"""
         <div style="padding:12px; border-radius:6px; background-color:{bg_color}; color:white; margin-bottom: 15px; box-shadow: 0 2px 4px rgba(0,0,0,0.2);">
             <h3 style="margin:0; font-size: 18px; font-family: monospace;">Relationship</h3>
             <div style="margin-top:4px; font-size: 12px; opacity: 0.9; text-transform: uppercase; letter-spacing: 1px;">{edge_type}</div>
         </div>
-        """, unsafe_allow_html=True)
+        """
 
         # 2. 关系属性列表
         # 展示所有属性，除了 type
-        _render_compact_table(data, ignore_keys={'type'})
+        return {"kind": "edge", "card": card, "table": _build_compact_table(data, ignore_keys=_IGNORE_EDGE_KEYS)}
 
     else:
-        st.warning(f"未找到 ID 为 {selected_id} 的元素信息")
+        return {"kind": "missing", "selected_id": selected_id}
 
 
-def _render_compact_table(data, ignore_keys):
-    """辅助函数：渲染紧凑的 HTML 属性表"""
-    simple_stats = {}
-    # 强制优先显示的属性
-    priority_keys = ['data_type', 'row_count', 'from_table', 'from_column', 'to_table', 'to_column', 'relation_type']
+def _emit_details_panel(panel):
+    """按 _build_details_panel 的结果输出属性面板"""
+    if panel["kind"] == "missing":
+        st.warning(f"未找到 ID 为 {panel['selected_id']} 的元素信息")
+        return
+
+    if panel["kind"] == "node":
+        st.write(panel["data"])
+
+    st.markdown(panel["card"], unsafe_allow_html=True)
+    if panel["table"]:
+        st.markdown("**📋 属性列表**")
+        st.markdown(panel["table"], unsafe_allow_html=True)
+
+    if panel["kind"] != "node":
+        return
+
+    if panel["samples"] is not None:
+        st.markdown("---")
+        st.markdown("**🎲 采样数据**")
+        # 样本没有有意义的行索引，保留 st.dataframe 以便隐藏索引 (st.table 不支持 hide_index)
+        st.dataframe(panel["samples"], height=150, hide_index=True, use_container_width=True)
+
+    if panel["word_frequency"] is not None:
+        st.markdown("---")
+        st.markdown("**🔡 高频词汇**")
+        st.table(panel["word_frequency"])
+
+    if panel["columns"] is not None:
+        column_count, column_text = panel["columns"]
+        st.markdown("---")
+        with st.expander(f"包含列 ({column_count})", expanded=False):
+            st.write(column_text)
+
+
+# 属性列表中不展示的字段 (已在其他区域单独展示，或为结构性字段)
+_IGNORE_NODE_KEYS = frozenset({'type', 'name', 'samples', 'word_frequency', 'columns', 'foreign_key',
+                               'reference_to', 'referenced_by', 'referenced_to', 'id'})
+_IGNORE_EDGE_KEYS = frozenset({'type'})
+# 属性列表中强制优先显示的属性 (按此顺序)
+_PRIORITY_KEYS = ('data_type', 'row_count', 'from_table', 'from_column', 'to_table', 'to_column', 'relation_type')
+_PRIORITY_KEY_SET = frozenset(_PRIORITY_KEYS)
+
+
+# 属性面板可直接展示的标量类型：先用 type() 集合查找命中常见情况，子类 (如 numpy.float64) 再走 isinstance
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+_SCALAR_TYPE_SET = frozenset(_SCALAR_TYPES)
+
 
-    for k in priority_keys:
+def _is_scalar(v):
+    return type(v) in _SCALAR_TYPE_SET or isinstance(v, _SCALAR_TYPES)
+
+
+def _build_compact_table(data, ignore_keys):
+    """辅助函数：构建紧凑的 HTML 属性表，没有可展示的属性时返回 None"""
+    simple_stats = {}
+    for k in _PRIORITY_KEYS:
         if k in data:
             simple_stats[k] = data[k]
 
     for k, v in data.items():
-        if k not in ignore_keys and k not in priority_keys and isinstance(v, (str, int, float, bool, type(None))):
+        if k not in ignore_keys and k not in _PRIORITY_KEY_SET and _is_scalar(v):
             simple_stats[k] = v
 
-    if simple_stats:
-        st.markdown("**📋 属性列表**")
-        table_html = """
-        <style>
-            .prop-table { width: 100%; border-collapse: collapse; font-size: 13px; font-family: sans-serif; }
-            .prop-table td { padding: 5px 8px; border-bottom: 1px solid #eee; vertical-align: top;}
-            .prop-key { color: #555; font-weight: 600; width: 40%; white-space: nowrap; }
-            .prop-val { color: #222; font-family: monospace; word-break: break-all; }
-        </style>
-        <table class="prop-table">
-        """
-        for k, v in simple_stats.items():
-            display_v = v
-            if isinstance(v, float): display_v = f"{v:.2f}"
-            table_html += f"<tr><td class='prop-key'>{k}</td><td class='prop-val'>{display_v}</td></tr>"
-        table_html += "</table>"
-        st.markdown(table_html, unsafe_allow_html=True)
+    if not simple_stats:
+        return None
+
+    # 样式表 (PROP_TABLE_STYLE) 由 main 每次运行输出一次，这里只拼接表格行
+    parts = ['<table class="prop-table">']
+    for k, v in simple_stats.items():
+        display_v = v
+        if isinstance(v, float): display_v = f"{v:.2f}"
+        parts.append(f"<tr><td class='prop-key'>{k}</td><td class='prop-val'>{display_v}</td></tr>")
+    parts.append("</table>")
+    return "".join(parts)
 
 
 # ==========================================
@@ -311,11 +479,14 @@ def main():
     G = load_graph_from_pkl(pkl_file)
     if G is None: st.stop()
 
+    st.markdown(PROP_TABLE_STYLE, unsafe_allow_html=True)
+
     col_graph, col_details = st.columns([3, 1])
 
     with col_graph:
         # 【修改点2】接收 edge_map
-        nodes, edges, edge_map = convert_nx_to_agraph(G, show_columns)
+        # 图元素按文件与显示模式缓存，仅 selected_id 变化的重跑不再重建 Node/Edge 对象
+        nodes, edges, edge_map = build_agraph_elements(pkl_file, show_columns)
 
         config = Config(
             width="100%",
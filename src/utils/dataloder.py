@@ -1,8 +1,16 @@
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Iterator
+
+try:
+    # 可选的 C 实现 JSON 解析器，未安装时回退到标准库 json
+    import orjson
+except ImportError:
+    orjson = None
 
 # 尝试导入配置，如果不存在则使用占位符，防止报错影响阅读
 from configs.paths import (
@@ -41,7 +49,7 @@ class DataLoader:
     }
 
     # 需要被标准化为 'sql' 的别名集合
-    SQL_ALIASES = {"query", "sql", "SQL"}
+    SQL_ALIASES = frozenset({"query", "sql", "SQL"})
 
     def __init__(self, dataset_name: str, auto_load: bool = True):
         """
@@ -61,6 +69,11 @@ class DataLoader:
 
         self.dataset_name = dataset_name
         self._raw_data: List[Dict[str, Any]] = []
+        # 字段名标准化映射，首次过滤时构建 (见 _get_rename_map)
+        self._rename_map: Optional[Dict[str, str]] = None
+        # db_id -> 行下标列表 的索引与唯一 db_id 列表，首次使用时构建 (数据加载后不再变化)
+        self._by_db_id: Optional[Dict[Any, List[int]]] = None
+        self._db_names: Optional[List[str]] = None
 
         if auto_load:
             self.load()
@@ -73,8 +86,16 @@ class DataLoader:
             paths = [paths]
 
         self._raw_data = []
-        for path in paths:
-            self._raw_data.extend(self._read_json(path))
+        self._rename_map = None
+        self._by_db_id = None
+        self._db_names = None
+        if len(paths) > 1:
+            # 多个文件并行读取与解析 (map 按输入顺序返回，合并顺序不变)
+            with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+                self._raw_data = list(chain.from_iterable(pool.map(self._read_json, paths)))
+        else:
+            for path in paths:
+                self._raw_data.extend(self._read_json(path))
 
         logger.info(f"数据集 [{self.dataset_name}] 加载完成，共 {len(self._raw_data)} 条数据。")
 
@@ -86,12 +107,74 @@ class DataLoader:
             return []
 
         try:
-            with open(path_obj, "r", encoding="utf-8") as f:
-                return json.load(f)
+            # 以字节读取：orjson 直接解析 UTF-8 字节；
+            # orjson 不接受的少数输入 (NaN/Infinity、超过 64 位的整数) 回退到 json.loads
+            with open(path_obj, "rb") as f:
+                raw = f.read()
+            if orjson is not None:
+                try:
+                    return orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    pass
+            return json.loads(raw)
         except json.JSONDecodeError:
             logger.error(f"文件格式错误（非标准 JSON）: {file_path}")
             return []
 
+    def _get_rename_map(self) -> Dict[str, str]:
+        """
+        字段名标准化映射 (原始 key -> 标准化 key)，基于首条数据构建并缓存。
+        同一数据集的字段基本一致，后续每个 key 只需一次 dict 查找。
+        """
+        if self._rename_map is None:
+            first_keys = self._raw_data[0].keys() if self._raw_data else ()
+            self._rename_map = {k: ("sql" if k in self.SQL_ALIASES else k) for k in first_keys}
+        return self._rename_map
+
+    def _ensure_db_index(self) -> Dict[Any, List[int]]:
+        """构建 db_id -> 行下标列表 的索引 (单次遍历)，按 db_id 过滤时无需扫描全部数据"""
+        if self._by_db_id is None:
+            index: Dict[Any, List[int]] = {}
+            for i, item in enumerate(self._raw_data):
+                index.setdefault(item.get("db_id"), []).append(i)
+            self._by_db_id = index
+        return self._by_db_id
+
+    def iter_filter(self,
+                    db_id: Optional[str] = None,
+                    fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        filter 的流式版本：逐条 yield 处理后的字典，不物化整个结果列表。
+        参数含义与 filter 相同。
+        """
+        # 1. 预处理：确定需要保留的字段集合
+        target_fields = set(fields) if fields else None
+        rename_map = self._get_rename_map()
+
+        # 2. DB_ID 过滤：通过索引只遍历匹配的行 (保持原有顺序)
+        if db_id:
+            raw_data = self._raw_data
+            items = (raw_data[i] for i in self._ensure_db_index().get(db_id, ()))
+        else:
+            items = self._raw_data
+
+        for item in items:
+            # 3. 字段映射与提取
+            # 标准化 Key：如果是 query 或 SQL，统一视为 sql (首条数据中未出现的 key 再查一次别名集合)
+            new_item = {}
+            for key, value in item.items():
+                normalized_key = rename_map.get(key)
+                if normalized_key is None:
+                    normalized_key = rename_map[key] = "sql" if key in self.SQL_ALIASES else key
+
+                # 判读逻辑：
+                # 如果没指定 fields -> 全部保留
+                # 如果指定了 fields -> 检查 normalized_key 是否在目标中
+                if target_fields is None or normalized_key in target_fields:
+                    new_item[normalized_key] = value
+
+            yield new_item
+
     def filter(self,
                db_id: Optional[str] = None,
                fields: Optional[List[str]] = None,
@@ -99,6 +182,7 @@ class DataLoader:
         """
         核心方法：过滤数据并提取特定字段。
         会自动将不同数据集的 SQL 字段统一重命名为 'sql'。
+        只需遍历结果时可使用 iter_filter，避免构建完整列表。
 
         Args:
             db_id: 数据库 ID 过滤 (Exact match)
@@ -108,29 +192,7 @@ class DataLoader:
         Returns:
             List[Dict]: 处理后的字典列表
         """
-        # 1. 预处理：确定需要保留的字段集合
-        target_fields = set(fields) if fields else None
-
-        results = []
-
-        for item in self._raw_data:
-            # 1. DB_ID 过滤
-            if db_id and item.get("db_id") != db_id:
-                continue
-
-            new_item = {}
-            # 2. 字段映射与提取
-            for key, value in item.items():
-                # 标准化 Key：如果是 query 或 SQL，统一视为 sql
-                normalized_key = "sql" if key in self.SQL_ALIASES else key
-
-                # 判读逻辑：
-                # 如果没指定 fields -> 全部保留
-                # 如果指定了 fields -> 检查 normalized_key 是否在目标中
-                if target_fields is None or normalized_key in target_fields:
-                    new_item[normalized_key] = value
-
-            results.append(new_item)
+        results = list(self.iter_filter(db_id=db_id, fields=fields))
 
         if verbose:
             logger.info(f"筛选结果: {len(results)}/{len(self._raw_data)} (db_id={db_id})")
@@ -138,9 +200,11 @@ class DataLoader:
         return results
 
     def get_db_names(self) -> List[str]:
-        """获取当前数据集中所有唯一的 db_id，并按字母排序"""
-        db_ids = {item.get("db_id") for item in self._raw_data if "db_id" in item}
-        return sorted(list(db_ids))
+        """获取当前数据集中所有唯一的 db_id，并按字母排序 (结果缓存，返回副本)"""
+        if self._db_names is None:
+            db_ids = {item.get("db_id") for item in self._raw_data if "db_id" in item}
+            self._db_names = sorted(list(db_ids))
+        return list(self._db_names)
 
     def inspect_sample(self, index: int = 0):
         """打印特定索引的数据结构，方便调试"""
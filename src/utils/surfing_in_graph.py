@@ -9,6 +9,18 @@ from src.neo4j_connector import get_driver
 class Neo4jExplorer:
     def __init__(self):
         self.driver = get_driver()
+        # 表 -> {列名: 列属性} 缓存，首次访问时一次查询加载全部表的列
+        self._table_columns = None
+        # 表 -> 1-hop 外键邻居表 (无向) 缓存，首次访问时一次查询构建
+        self._fk_neighbors = None
+        # (表, n_hop) -> n-hop 邻居表 缓存 (n_hop >= 2，结果取自 apoc 路径扩展)
+        self._khop_neighbors = {}
+
+    def clear_cache(self):
+        """清空本地缓存的图结构 (Neo4j 中重新导入了其他数据库的图之后调用)"""
+        self._table_columns = None
+        self._fk_neighbors = None
+        self._khop_neighbors = {}
 
     def get_all_nodes(self):
         query = """
@@ -77,7 +89,14 @@ class Neo4jExplorer:
 
         返回：
             dict: 列名到属性的映射
+
+        注意：结果会被缓存，Neo4j 中的图被替换后需调用 clear_cache()。
         """
+        if self._table_columns is None:
+            self._table_columns = self._load_all_table_columns()
+        if self._table_columns.get(table_name):
+            return self._table_columns[table_name]
+
         query = """
         MATCH (t:Table {name: $table_name})-[:HAS_COLUMN]->(c:Column)
         RETURN c.name AS name, properties(c) AS properties
@@ -89,6 +108,7 @@ class Neo4jExplorer:
                 columns = {record["name"]: record["properties"] for record in result}
 
             if columns:
+                self._table_columns[table_name] = columns
                 return columns
             else:
                 print(f"[WARNING] 第 {attempt} 次尝试：没有找到表 '{table_name}' 的列信息。")
@@ -100,7 +120,55 @@ class Neo4jExplorer:
         # 理论上永远到不了这里
         return {}
 
+    def _load_all_table_columns(self):
+        """
+        一次查询取回所有表的列信息，构建 {表名: {列名: 列属性}}。
+        Schema Linking 中会对同一批表反复调用 get_columns_for_table，避免每次都往返 Neo4j。
+        """
+        query = """
+        MATCH (t:Table)-[:HAS_COLUMN]->(c:Column)
+        RETURN t.name AS table_name, c.name AS name, properties(c) AS properties
+        """
+        table_columns = {}
+        with self.driver.session() as session:
+            result = session.run(query)
+            for record in result:
+                table_columns.setdefault(record["table_name"], {})[record["name"]] = record["properties"]
+        return table_columns
+
+    def _load_fk_neighbors(self):
+        """
+        一次查询取回全部 Table-FOREIGN_KEY-Table 关系，构建无向的表级邻接表。
+        is_subgraph_connected / bfs_subgraph 对每个表都要找 1-hop 邻居，避免逐表调用 apoc 路径扩展。
+        """
+        query = """
+        MATCH (t1:Table)-[:FOREIGN_KEY]-(t2:Table)
+        RETURN DISTINCT t1.name AS table_name, t2.name AS neighbor_table
+        """
+        fk_neighbors = {}
+        with self.driver.session() as session:
+            result = session.run(query)
+            for record in result:
+                fk_neighbors.setdefault(record["table_name"], []).append(record["neighbor_table"])
+        return fk_neighbors
+
     def get_neighbor_tables(self, table_name, n_hop):
+        if n_hop == 1:
+            # 1-hop 邻居直接查本地缓存的表级邻接表
+            if self._fk_neighbors is None:
+                self._fk_neighbors = self._load_fk_neighbors()
+            neighbor_tables = list(self._fk_neighbors.get(table_name, []))
+            if not neighbor_tables:
+                print(f"[WARNING] 没有找到 {n_hop}-hop 的相关表，请检查表名或数据库连接。")
+            return neighbor_tables
+
+        cache_key = (table_name, n_hop)
+        if cache_key in self._khop_neighbors:
+            neighbor_tables = list(self._khop_neighbors[cache_key])
+            if not neighbor_tables:
+                print(f"[WARNING] 没有找到 {n_hop}-hop 的相关表，请检查表名或数据库连接。")
+            return neighbor_tables
+
         query = """
         MATCH (t:Table {name: $table_name})
         CALL apoc.path.expandConfig(t, {relationshipFilter: "FOREIGN_KEY", minLevel: $n_hop, maxLevel: $n_hop, labelFilter: "+Table"}) 
@@ -110,6 +178,8 @@ class Neo4jExplorer:
         with self.driver.session() as session:
             result = session.run(query, table_name=table_name, n_hop=n_hop)
             neighbor_tables = [record["neighbor_table"] for record in result]
+        self._khop_neighbors[cache_key] = neighbor_tables
+        neighbor_tables = list(neighbor_tables)
 
         if not neighbor_tables:
             print(f"[WARNING] 没有找到 {n_hop}-hop 的相关表，请检查表名或数据库连接。")
@@ -117,24 +187,41 @@ class Neo4jExplorer:
         return neighbor_tables
 
     def is_subgraph_connected(self, selected_tables):
+        """
+        判断选定表在外键关系上构成的子图 (仅经由选定表本身) 是否连通。
+        基于缓存的 1-hop 邻接表做并查集合并，不再逐表 BFS 扩展。
+        """
         if not selected_tables:
             return False
 
-        visited = set()
-        queue = [selected_tables[0]]  # 从任意一个表开始 BFS
-
-        while queue:
-            current_table = queue.pop(0)
-            if current_table in visited:
-                continue
+        if self._fk_neighbors is None:
+            self._fk_neighbors = self._load_fk_neighbors()
 
-            visited.add(current_table)
-            neighbors = self.get_neighbor_tables(current_table, 1)
-            for neighbor in neighbors:
-                if neighbor in selected_tables and neighbor not in visited:
-                    queue.append(neighbor)
-
-        return len(visited) == len(selected_tables)
+        selected = set(selected_tables)
+        if len(selected) != len(selected_tables):
+            # 与原 BFS 实现一致：列表中含重复表时 (访问到的表数 != 列表长度) 视为不连通
+            return False
+        parent = {table: table for table in selected}
+
+        def find(table):
+            # 路径减半
+            while parent[table] != table:
+                parent[table] = parent[parent[table]]
+                table = parent[table]
+            return table
+
+        components = len(selected)
+        for table in selected:
+            for neighbor in self._fk_neighbors.get(table, []):
+                if neighbor in selected:
+                    root_a, root_b = find(table), find(neighbor)
+                    if root_a != root_b:
+                        parent[root_a] = root_b
+                        components -= 1
+                        if components == 1:
+                            return True
+
+        return components == 1
 
     def bfs_subgraph(self, selected_tables):
         all_tables = set(self.get_all_tables().keys())